@@ -0,0 +1,274 @@
+"""
+가게 건강 진단 리포트 일괄 생성 (오프라인 배치)
+
+mcp_server.py의 툴 로직으로 가맹점 데이터를 모으고, Gemini로 '[1] 전체 진단 JSON 형식' 응답을 받아
+streamlit_app.py와 같은 섹션 레이아웃의 HTML 리포트로 저장합니다.
+
+사용 예:
+    uv run batch_report.py --district 서울숲역 --out reports/서울숲역 --workers 4 --llm-concurrency 2 --rpm 60
+
+중단 후 같은 명령으로 다시 실행하면 checkpoint.jsonl에 완료로 기록된 가맹점은 건너뜁니다.
+"""
+import argparse
+import html
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from prompts import system_prompt
+from report import (
+    SECTION_BASIC_INFO, SECTION_DIAGNOSIS, SECTION_PRESCRIPTIONS,
+    extract_age_gender, extract_usage_ratios, parse_sections,
+    save_pie_chart_png, save_population_pyramid_png,
+)
+
+logger = logging.getLogger("batch_report")
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+# 워커 프로세스 전역 상태 (_init_worker에서 설정)
+_LLM = None
+_LLM_SLOTS = None
+_LIMITER = None
+_OUT_DIR: Optional[Path] = None
+
+
+class SharedRateLimiter:
+    """
+    프로세스 간 공유되는 최소 간격 기반 속도 제한기 (분당 rpm회).
+    다음 호출 가능 시각을 공유 메모리 값으로 두고, 호출마다 1/rpm 분씩 뒤로 미룹니다.
+    """
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.next_at = mp.Value("d", 0.0)
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self.next_at.get_lock():
+            now = time.monotonic()
+            start = max(now, self.next_at.value)
+            self.next_at.value = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _tool_fn(tool):
+    """@mcp.tool() 데코레이터가 감싼 툴에서 원래 함수 꺼내기"""
+    return getattr(tool, "fn", tool)
+
+
+def _init_worker(llm_slots, limiter: SharedRateLimiter, out_dir: str):
+    global _LLM, _LLM_SLOTS, _LIMITER, _OUT_DIR
+    from llm_client import create_llm, load_api_key
+
+    _LLM = create_llm(load_api_key())
+    _LLM_SLOTS = llm_slots
+    _LIMITER = limiter
+    _OUT_DIR = Path(out_dir)
+
+
+def _build_prompt(detail: Dict[str, Any], street: Dict[str, Any], industry: Dict[str, Any],
+                  templates: Dict[str, Any]) -> str:
+    dump = lambda d: json.dumps(d, ensure_ascii=False, default=str)
+    name = detail["detail"].get("가맹점명")
+    return (
+        f"가맹점 '{name}'의 전체 건강 진단을 '[1] 전체 진단 JSON 형식'으로 작성해줘.\n\n"
+        f"[get_merchant_detail 결과]\n{dump(detail)}\n\n"
+        f"[my_street_risk 결과]\n{dump(street)}\n\n"
+        f"[get_compare_industry 결과]\n{dump(industry)}\n\n"
+        f"[get_prescription_templates 결과]\n{dump(templates)}"
+    )
+
+
+def _img(path: Path) -> str:
+    """리포트 HTML에서 charts/ 아래 PNG를 참조하는 <img> 태그"""
+    return f'<img src="{html.escape(path.parent.name + "/" + path.name)}" alt="{html.escape(path.stem)}">'
+
+
+def _text(value: Any) -> str:
+    return html.escape(str(value or "")).replace("\\n", "<br>").replace("\n", "<br>")
+
+
+def render_html(merchant_id: str, name: str, sections: Optional[List[Dict[str, Any]]], raw: str, chart_dir: Path) -> str:
+    """render_messages와 같은 섹션 레이아웃으로 HTML 리포트 생성"""
+    body = []
+    if sections is None:
+        body.append(f"<p>{_text(raw)}</p>")
+    for item in sections or []:
+        section = item.get("section", "결과")
+        content_text = item.get("content", "")
+        basis = item.get("basis", "")
+
+        body.append(f"<h2>{html.escape(section)}</h2>")
+        if section == SECTION_DIAGNOSIS:
+            for c in content_text:
+                body.append(f"<p><b>- 최종 등급:</b> {_text(c.get('rank', '최종등급'))}<br>"
+                            f"<b>- 위험지수백분위 (상위):</b> {_text(c.get('danger', '위험지수백분위'))}</p>")
+                body.append(f"<p>{_text(c.get('text'))}</p>")
+        elif section in SECTION_PRESCRIPTIONS:
+            for c in content_text:
+                body.append(f"<h3>💊{_text(c.get('title', '처방명'))}</h3>")
+                body.append(f"<p>{_text(c.get('subscription', '설명'))}</p>")
+                body.append(f'<p class="success">{_text(c.get("subbasis"))}</p>')
+        else:
+            body.append(f"<p>{_text(content_text)}</p>")
+
+        if basis:
+            body.append("<details open><summary>💡 데이터 기반 근거 보기</summary>")
+            body.append(f'<p class="info">{_text(basis)}</p>')
+            if section == SECTION_BASIC_INFO:
+                ratios = extract_usage_ratios(basis)
+                if ratios:
+                    body.append(_img(save_pie_chart_png(*ratios, chart_dir / f"{merchant_id}_pie.png")))
+                age_gender_data = extract_age_gender(basis)
+                if age_gender_data:
+                    body.append(_img(save_population_pyramid_png(age_gender_data, chart_dir / f"{merchant_id}_pyramid.png")))
+            body.append("</details><hr>")
+
+    return f"""<!DOCTYPE html>
+<html lang="ko"><head><meta charset="utf-8"><title>가게 건강 진단 - {html.escape(name)}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 760px; margin: 2em auto; line-height: 1.6; }}
+.info {{ background: #eef5fc; padding: .8em; }} .success {{ background: #edf8ee; padding: .8em; }}
+img {{ max-width: 100%; }}
+</style></head>
+<body><h1>👨‍⚕️ 가게 건강 진단 - {html.escape(name)}</h1>
+{chr(10).join(body)}
+</body></html>
+"""
+
+
+def diagnose(merchant_id: str) -> Dict[str, Any]:
+    """가맹점 하나의 진단 리포트를 생성 (워커 프로세스에서 실행)"""
+    import mcp_server
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    started = time.perf_counter()
+    try:
+        detail = _tool_fn(mcp_server.get_merchant_detail)(merchant_id)
+        if not detail["found"]:
+            return {"merchant_id": merchant_id, "status": "skipped", "error": detail["message"]}
+        street = _tool_fn(mcp_server.my_street_risk)(merchant_id)
+        industry = _tool_fn(mcp_server.get_compare_industry)(merchant_id)
+        templates = _tool_fn(mcp_server.get_prescription_templates)(merchant_id)
+
+        # LLM 호출: 전체 동시 호출 수 제한 + 분당 호출 수 제한
+        with _LLM_SLOTS:
+            _LIMITER.wait()
+            reply = _LLM.invoke([
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=_build_prompt(detail, street, industry, templates)),
+            ]).content
+
+        name = str(detail["detail"].get("가맹점명"))
+        chart_dir = _OUT_DIR / "charts"
+        chart_dir.mkdir(parents=True, exist_ok=True)
+        out_file = _OUT_DIR / f"{merchant_id}.html"
+        out_file.write_text(render_html(merchant_id, name, parse_sections(reply), reply, chart_dir), encoding="utf-8")
+
+        return {"merchant_id": merchant_id, "status": "ok", "file": out_file.name,
+                "elapsed": round(time.perf_counter() - started, 2)}
+    except Exception as e:
+        logger.error(f"[{merchant_id}] 리포트 생성 실패: {e!r}")
+        return {"merchant_id": merchant_id, "status": "error", "error": repr(e),
+                "elapsed": round(time.perf_counter() - started, 2)}
+
+
+def _load_checkpoint(path: Path) -> set:
+    """완료(ok/skipped)로 기록된 가맹점ID 목록"""
+    done = set()
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 중단 시 잘린 마지막 줄
+                if record.get("status") in ("ok", "skipped"):
+                    done.add(record["merchant_id"])
+    return done
+
+
+def _select_merchants(args) -> List[str]:
+    import mcp_server
+
+    mcp_server.ensure_loaded()
+    df = mcp_server.DF
+    if args.ids:
+        return list(dict.fromkeys(args.ids))
+    if args.district:
+        df = df[df["상권"] == args.district]
+    if args.industry:
+        df = df[df["업종"] == args.industry]
+    ids = df["가맹점ID"].astype(str).tolist()
+    return ids[:args.limit] if args.limit else ids
+
+
+def run(args) -> Dict[str, Any]:
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = out_dir / CHECKPOINT_FILE
+
+    merchant_ids = _select_merchants(args)
+    done = _load_checkpoint(checkpoint)
+    todo = [m for m in merchant_ids if m not in done]
+    logger.info(f"대상 가맹점 {len(merchant_ids)}개 중 완료 {len(merchant_ids) - len(todo)}개, 남은 작업 {len(todo)}개")
+
+    llm_slots = mp.BoundedSemaphore(args.llm_concurrency)
+    limiter = SharedRateLimiter(args.rpm)
+    counts = {"ok": 0, "skipped": 0, "error": 0}
+    started = time.perf_counter()
+
+    with open(checkpoint, "a", encoding="utf-8") as ckpt, ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(llm_slots, limiter, str(out_dir)),
+    ) as pool:
+        futures = [pool.submit(diagnose, m) for m in todo]
+        for n, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            counts[record["status"]] += 1
+            ckpt.write(json.dumps(record, ensure_ascii=False) + "\n")
+            ckpt.flush()
+            os.fsync(ckpt.fileno())
+
+            minutes = (time.perf_counter() - started) / 60
+            logger.info(f"[{n}/{len(todo)}] {record['merchant_id']} {record['status']} - "
+                        f"처리량 {n / minutes if minutes > 0 else 0:.1f} 가맹점/분")
+
+    minutes = (time.perf_counter() - started) / 60
+    summary = {
+        **counts,
+        "total": len(todo),
+        "minutes": round(minutes, 2),
+        "merchants_per_minute": round(len(todo) / minutes, 1) if minutes > 0 else None,
+    }
+    logger.info(f"배치 완료 - {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가게 건강 진단 리포트 일괄 생성")
+    parser.add_argument("--out", required=True, help="리포트 저장 폴더 (checkpoint.jsonl 포함)")
+    parser.add_argument("--district", help="상권 이름으로 대상 제한")
+    parser.add_argument("--industry", help="업종으로 대상 제한")
+    parser.add_argument("--ids", nargs="+", help="가맹점ID 직접 지정")
+    parser.add_argument("--limit", type=int, help="최대 가맹점 수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="프로세스 수")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="동시 LLM 호출 수")
+    parser.add_argument("--rpm", type=float, default=60, help="분당 LLM 호출 수 제한 (0이면 제한 없음)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    print(json.dumps(run(args), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
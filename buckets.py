@@ -0,0 +1,108 @@
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 구간형(문자열) 컬럼 목록
+BUCKET_COLUMNS = [
+    "가맹점 운영개월수 구간",
+    "매출금액 구간",
+    "매출건수 구간",
+    "유니크 고객 수 구간",
+    "객단가 구간",
+    "취소율 구간",
+]
+
+# 코드 → 라벨 조회 테이블 (코드가 작을수록 상위 구간)
+BUCKET_LABELS = [
+    "상위 10% 이내",
+    "상위 10-25%",
+    "상위 25-50%",
+    "하위 25-50%",
+    "하위 10-25%",
+    "하위 10% 이내",
+]
+MISSING_CODE = -1
+
+_LABEL_TO_CODE = {label: code for code, label in enumerate(BUCKET_LABELS)}
+
+
+def _parse(value: Any) -> int:
+    """구간 문자열 하나를 정수 코드로 변환 (결측/알 수 없는 값은 -1)"""
+    if not isinstance(value, str):
+        return MISSING_CODE
+    label = value.strip().replace("~", "-")
+    code = _LABEL_TO_CODE.get(label)
+    if code is None:
+        logger.warning(f"[buckets] 알 수 없는 구간 값: {value!r}")
+        return MISSING_CODE
+    return code
+
+
+def encode(series: pd.Series) -> pd.Series:
+    """구간 문자열 컬럼을 int8 코드 컬럼으로 변환"""
+    codes = series.map(_parse).to_numpy(dtype=np.int8)
+    return pd.Series(codes, index=series.index, name=series.name)
+
+
+def encode_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame 안의 구간형 컬럼을 모두 int8 코드로 치환"""
+    for col in BUCKET_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = encode(df[col])
+    return df
+
+
+def decode(code: Any) -> Optional[str]:
+    """정수 코드 → 구간 라벨 (결측은 None)"""
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return code
+    if 0 <= code < len(BUCKET_LABELS):
+        return BUCKET_LABELS[code]
+    return None
+
+
+def decode_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """row dict 안의 구간형 컬럼 코드를 라벨로 되돌림"""
+    return {k: decode(v) if k in BUCKET_COLUMNS else v for k, v in record.items()}
+
+
+def peer_stats(codes: pd.Series, target_code: Any = None) -> Optional[Dict[str, Any]]:
+    """
+    비교 집단의 구간 코드로 서열 통계를 계산합니다.
+
+    반환값:
+      {
+        "median": str,                  # 중앙값 구간
+        "p25": str, "p75": str,         # 상위 25% / 하위 25% 지점 구간
+        "distribution": {라벨: 비율(%)},
+        "target_share_at_or_above": float | None  # 대상과 같거나 더 상위 구간에 있는 비교 집단 비율(%)
+      }
+    """
+    values = np.asarray(codes, dtype=np.int8)
+    values = values[values != MISSING_CODE]
+    if len(values) == 0:
+        return None
+
+    counts = np.bincount(values, minlength=len(BUCKET_LABELS))
+    quantiles = np.percentile(values, [25, 50, 75], method="lower")
+    result = {
+        "median": BUCKET_LABELS[int(quantiles[1])],
+        "p25": BUCKET_LABELS[int(quantiles[0])],
+        "p75": BUCKET_LABELS[int(quantiles[2])],
+        "distribution": {
+            label: round(float(count) * 100 / len(values), 2)
+            for label, count in zip(BUCKET_LABELS, counts)
+        },
+        "target_share_at_or_above": None,
+    }
+    if target_code is not None and decode(target_code) is not None:
+        result["target_share_at_or_above"] = round(
+            float((values <= int(target_code)).sum()) * 100 / len(values), 2
+        )
+    return result
@@ -0,0 +1,161 @@
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 로컬 주소 → 좌표 테이블 (컬럼: 주소, 위도, 경도). 네트워크 지오코딩을 쓰지 않습니다.
+COORD_TABLE = Path(os.environ.get("MERCHANT_COORD_TABLE", "./data/address_coords.csv"))
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_CELL_M = 250.0
+# 반경 검색 상한 (격자 셀 수가 반경 제곱에 비례하므로 제한)
+MAX_RADIUS_M = 5000.0
+
+# "왕십리로4가길 9", "성수이로 7-1" 처럼 주소 끝의 건물번호
+_BUILDING_NO = re.compile(r"\s+\d+(-\d+)?$")
+
+
+def normalize_address(address) -> Optional[str]:
+    """공백을 정리한 주소 문자열 (결측은 None)"""
+    if not isinstance(address, str):
+        return None
+    address = " ".join(address.split())
+    return address or None
+
+
+def _road_key(address: Optional[str]) -> Optional[str]:
+    """건물번호를 뗀 도로명 단위 키"""
+    if address is None:
+        return None
+    return _BUILDING_NO.sub("", address)
+
+
+def geocode(addresses: pd.Series, table: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    로컬 좌표 테이블로 주소를 위경도로 변환합니다.
+    정확히 일치하는 주소가 없으면 같은 도로명 주소들의 평균 좌표를 사용하고, 그래도 없으면 NaN입니다.
+    """
+    table = table.assign(_addr=table["주소"].map(normalize_address)).dropna(subset=["_addr", "위도", "경도"])
+    exact = table.groupby("_addr")[["위도", "경도"]].mean()
+    road = table.assign(_road=table["_addr"].map(_road_key)).groupby("_road")[["위도", "경도"]].mean()
+
+    normalized = addresses.map(normalize_address)
+    coords = exact.reindex(normalized).to_numpy(dtype=np.float64)
+
+    missing = np.isnan(coords[:, 0])
+    if missing.any():
+        coords[missing] = road.reindex(normalized[missing].map(_road_key)).to_numpy(dtype=np.float64)
+
+    logger.info(
+        f"[geo] 지오코딩 완료 - 전체={len(coords)}, 주소일치={int((~missing).sum())}, "
+        f"도로명대체={int(missing.sum() - np.isnan(coords[:, 0]).sum())}, 실패={int(np.isnan(coords[:, 0]).sum())}"
+    )
+    return coords[:, 0], coords[:, 1]
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """두 지점 사이 거리(m), 배열 입력 지원"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class GridIndex:
+    """
+    가맹점 좌표에 대한 균일 격자 인덱스.
+    위경도를 기준 위도에서 평면(m)으로 투영해 cell_m 크기 격자로 나누고,
+    격자 키 기준으로 정렬한 행 위치 배열을 searchsorted로 조회합니다.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_m: float = DEFAULT_CELL_M):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_m = float(cell_m)
+
+        valid = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        self.lat0 = float(np.mean(self.lat[valid])) if valid.any() else 0.0
+
+        positions = np.flatnonzero(valid)
+        keys = self._cell_keys(*self._cells(self.lat[positions], self.lon[positions]))
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.positions = positions[order]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """공유 세그먼트에 저장할 배열"""
+        return {"lat": self.lat, "lon": self.lon, "keys": self.keys, "positions": self.positions}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], lat0: float, cell_m: float) -> "GridIndex":
+        """저장된 배열(읽기 전용 memmap)로 다시 계산 없이 인덱스 구성"""
+        index = cls.__new__(cls)
+        index.lat, index.lon = arrays["lat"], arrays["lon"]
+        index.keys, index.positions = arrays["keys"], arrays["positions"]
+        index.lat0, index.cell_m = float(lat0), float(cell_m)
+        return index
+
+    def _cells(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        x = np.radians(lon) * np.cos(np.radians(self.lat0)) * EARTH_RADIUS_M
+        y = np.radians(lat) * EARTH_RADIUS_M
+        return np.floor(x / self.cell_m).astype(np.int64), np.floor(y / self.cell_m).astype(np.int64)
+
+    @staticmethod
+    def _cell_keys(ix, iy) -> np.ndarray:
+        return (np.asarray(ix, dtype=np.int64) << 32) + (np.asarray(iy, dtype=np.int64) & 0xFFFFFFFF)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def query(self, lat: float, lon: float, radius_m: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(lat, lon)에서 radius_m 안에 있는 행 위치와 거리(m)를 가까운 순으로 반환"""
+        if not 0 < radius_m <= MAX_RADIUS_M:
+            raise ValueError(f"radius_m은 0보다 크고 {MAX_RADIUS_M:g} 이하여야 합니다: {radius_m!r}")
+        ix, iy = self._cells(np.array([lat]), np.array([lon]))
+        reach = int(np.ceil(radius_m / self.cell_m))
+        dx, dy = np.meshgrid(np.arange(-reach, reach + 1), np.arange(-reach, reach + 1))
+        cell_keys = self._cell_keys(ix[0] + dx.ravel(), iy[0] + dy.ravel())
+
+        left = np.searchsorted(self.keys, cell_keys, side="left")
+        right = np.searchsorted(self.keys, cell_keys, side="right")
+        hits = [self.positions[l:r] for l, r in zip(left, right) if r > l]
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        candidates = np.concatenate(hits)
+        distances = haversine_m(lat, lon, self.lat[candidates], self.lon[candidates])
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+
+def load_index(df: pd.DataFrame, csv_path: Path, table_path: Path = COORD_TABLE,
+               cell_m: float = DEFAULT_CELL_M) -> Optional[GridIndex]:
+    """
+    좌표 테이블이 있으면 df['주소']를 지오코딩해 격자 인덱스를 만듭니다. 없으면 None.
+    지오코딩 결과와 격자 배열은 (가맹점 CSV, 좌표 테이블) 버전별 공유 세그먼트에 한 번만 만들고 워커들이 memmap으로 붙습니다.
+    """
+    import shared_data
+
+    table_path = Path(table_path)
+    if not table_path.exists():
+        logger.warning(f"[geo] 좌표 테이블 없음 - {table_path}, 반경 검색을 사용할 수 없습니다.")
+        return None
+
+    def build():
+        lat, lon = geocode(df["주소"], pd.read_csv(table_path))
+        built = GridIndex(lat, lon, cell_m=cell_m)
+        return built.arrays(), {"lat0": built.lat0}
+
+    arrays, extra = shared_data.attach_arrays(
+        f"geo-{Path(csv_path).stem}", [Path(csv_path), table_path], build, params=(int(cell_m),)
+    )
+    index = GridIndex.from_arrays(arrays, extra["lat0"], cell_m)
+    logger.info(f"[geo] 격자 인덱스 연결 - 좌표 보유 가맹점 수={len(index)}, cell={cell_m}m")
+    return index
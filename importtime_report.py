@@ -0,0 +1,130 @@
+"""
+콜드 스타트 import 비용 리포트 (python -X importtime 기반)
+
+각 스크립트의 최상위 import 문만 골라 새 인터프리터에서 실행하고, 누적 import 시간이 큰 모듈을 보여줍니다.
+--compare REF를 주면 해당 git 리비전의 트리와 현재 작업 트리를 나란히 비교합니다.
+--full을 주면 import 문 대신 모듈 자체를 import 합니다 (mcp_server.py처럼 import 시 실행되는 작업까지 포함).
+
+사용 예:
+    uv run importtime_report.py streamlit_app.py mcp_server.py --compare 882a1a2~1
+    uv run importtime_report.py mcp_server.py --full
+"""
+import argparse
+import ast
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MISSING_MARK = "__IMPORTTIME_MISSING__"
+
+
+def _top_level_imports(source: str) -> List[str]:
+    """모듈 최상위(if/try 블록 포함, `if TYPE_CHECKING:` 제외)에서 실행되는 import 문"""
+    statements = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statements.append(ast.unparse(node))
+            elif isinstance(node, ast.If):
+                if "TYPE_CHECKING" in ast.unparse(node.test):
+                    continue
+                visit(node.body)
+                visit(node.orelse)
+            elif isinstance(node, ast.Try):
+                visit(node.body)
+
+    visit(ast.parse(source).body)
+    return statements
+
+
+def _probe_code(statements: List[str]) -> str:
+    """import 문을 하나씩 실행하되, 설치되지 않은 패키지는 건너뛰고 표시"""
+    lines = []
+    for stmt in statements:
+        lines.append("try:")
+        lines.append(f"    {stmt}")
+        lines.append("except ImportError as e:")
+        lines.append(f"    print({MISSING_MARK!r}, repr(e))")
+    return "\n".join(lines)
+
+
+def _run_importtime(code: str, cwd: Path) -> Tuple[List[Tuple[float, str]], List[str]]:
+    """-X importtime 출력에서 최상위 모듈별 누적 시간(ms)과 누락 패키지 목록 추출"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, capture_output=True, text=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name.startswith(" ") and not name.startswith("  "):
+            entries.append((int(cumulative) / 1000, name.strip()))
+    missing = [line.split(" ", 1)[1] for line in proc.stdout.splitlines() if line.startswith(MISSING_MARK)]
+    if proc.returncode != 0:
+        missing.append(proc.stderr.strip().splitlines()[-1])
+    return entries, missing
+
+
+def measure(target: str, root: Path, full: bool) -> Dict:
+    if full:
+        code = f"import {Path(target).stem}"
+    else:
+        code = _probe_code(_top_level_imports((root / target).read_text(encoding="utf-8")))
+    entries, missing = _run_importtime(code, root)
+    return {
+        "total_ms": sum(ms for ms, _ in entries),
+        "top": sorted(entries, reverse=True),
+        "missing": missing,
+    }
+
+
+def _export_rev(rev: str, dest: Path):
+    """git 리비전의 트리를 임시 폴더에 풀기"""
+    archive = subprocess.run(["git", "archive", "--format=tar", rev], capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(dest, filter="data")  # 경로 조작 / 특수 파일 차단 (3.12+ 기본 경고 방지)
+        else:
+            tar.extractall(dest)
+
+
+def _print_result(label: str, result: Dict, top: int):
+    print(f"  [{label}] total {result['total_ms']:.1f} ms")
+    for ms, name in result["top"][:top]:
+        print(f"    {ms:9.1f} ms  {name}")
+    for m in result["missing"]:
+        print(f"    (skipped) {m}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="-X importtime 기반 콜드 스타트 리포트")
+    parser.add_argument("targets", nargs="*", default=["streamlit_app.py", "mcp_server.py"])
+    parser.add_argument("--compare", metavar="REF", help="비교할 git 리비전 (before)")
+    parser.add_argument("--full", action="store_true", help="import 문 대신 모듈 자체를 import")
+    parser.add_argument("--top", type=int, default=8, help="표시할 상위 모듈 수")
+    args = parser.parse_args()
+
+    before_dir: Optional[tempfile.TemporaryDirectory] = None
+    if args.compare:
+        before_dir = tempfile.TemporaryDirectory()
+        _export_rev(args.compare, Path(before_dir.name))
+
+    for target in args.targets:
+        print(f"== {target} ==")
+        if before_dir is not None:
+            _print_result(f"before {args.compare}", measure(target, Path(before_dir.name), args.full), args.top)
+        _print_result("after" if before_dir is not None else "current", measure(target, Path.cwd(), args.full), args.top)
+
+    if before_dir is not None:
+        before_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import tomllib
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# 재시도 대상 HTTP 상태 코드 (쿼터 초과 / 일시적 서버 오류)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    스레드 간 공유되는 토큰 버킷 속도 제한기.
+    Streamlit 세션마다 스레드와 이벤트 루프가 다르므로 threading.Lock으로 보호하고,
+    기다릴 때만 asyncio.sleep / time.sleep을 사용합니다.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """토큰을 하나 가져가면 0, 부족하면 기다려야 할 시간(초)을 반환"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def _enter(self, delta: int):
+        with self._lock:
+            self.waiting += delta
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        self._enter(1)
+        try:
+            while (delay := self._take()) > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._enter(-1)
+
+    def acquire_sync(self):
+        if self.rate <= 0:
+            return
+        self._enter(1)
+        try:
+            while (delay := self._take()) > 0:
+                time.sleep(delay)
+        finally:
+            self._enter(-1)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """쿼터 초과(429)나 일시적 서버 오류인지 판단 (감싼 예외의 원인까지 확인)"""
+    while exc is not None:
+        status = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+        if isinstance(status, int) and status in RETRYABLE_STATUS:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class _LeaderAborted(Exception):
+    """병합된 요청의 leader가 취소/인터럽트로 중단됨 (기다리던 요청은 직접 다시 호출)"""
+
+
+class RequestGate:
+    """
+    모델 호출 공용 관문: 토큰 버킷 속도 제한 + 동일 요청 병합 + 지터 백오프 재시도.
+
+    같은 key로 동시에 들어온 요청은 첫 요청(leader)만 실제로 호출하고,
+    나머지는 leader의 결과(또는 Exception)를 그대로 공유합니다.
+    leader가 취소(CancelledError)나 인터럽트로 중단되면 그 예외는 공유하지 않고, 기다리던 요청 중 하나가 다시 호출합니다.
+    """
+
+    def __init__(self, rpm: float, burst: float, max_retries: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 30.0):
+        self.bucket = TokenBucket(rpm / 60.0, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._stats = {"calls": 0, "coalesced": 0, "retries": 0, "errors": 0}
+
+    def metrics(self) -> Dict[str, int]:
+        """대기열 길이 / 진행 중 요청 수 / 누적 카운터"""
+        with self._lock:
+            return {
+                "queue_depth": self.bucket.waiting,
+                "in_flight": len(self._in_flight),
+                **self._stats,
+            }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """key에 대한 진행 중 요청이 있으면 (그 Future, False), 없으면 새로 등록해 (Future, True)"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def _release(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        """full jitter 지수 백오프"""
+        self._count("retries")
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        logger.warning(f"[llm_client] 재시도 {attempt + 1}/{self.max_retries} - {delay:.1f}초 후 ({exc!r})")
+        return delay
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            future, leader = self._claim(key)
+            if leader:
+                break
+            logger.info(f"[llm_client] 동일 요청 병합 - key={key[:12]}")
+            try:
+                # shield: 이 호출자가 취소되어도 공유 Future는 취소하지 않음
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderAborted:
+                logger.info(f"[llm_client] 병합 대상 요청이 중단되어 다시 요청 - key={key[:12]}")
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self.bucket.acquire()
+                self._count("calls")
+                try:
+                    result = await call()
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    await asyncio.sleep(self._backoff(attempt, e))
+        except Exception as e:
+            self._count("errors")
+            self._release(key, future, error=e)
+            raise
+        except BaseException:
+            # 취소/인터럽트는 이 호출자만의 사정이므로 공유하지 않고, 기다리던 요청이 다시 호출하게 함
+            self._release(key, future, error=_LeaderAborted())
+            raise
+        self._release(key, future, result=result)
+        return result
+
+    def run_sync(self, key: str, call: Callable[[], T]) -> T:
+        while True:
+            future, leader = self._claim(key)
+            if leader:
+                break
+            logger.info(f"[llm_client] 동일 요청 병합 - key={key[:12]}")
+            try:
+                return future.result()
+            except _LeaderAborted:
+                logger.info(f"[llm_client] 병합 대상 요청이 중단되어 다시 요청 - key={key[:12]}")
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                self.bucket.acquire_sync()
+                self._count("calls")
+                try:
+                    result = call()
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    time.sleep(self._backoff(attempt, e))
+        except Exception as e:
+            self._count("errors")
+            self._release(key, future, error=e)
+            raise
+        except BaseException:
+            self._release(key, future, error=_LeaderAborted())
+            raise
+        self._release(key, future, result=result)
+        return result
+
+
+def request_key(model: str, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+    """모델/메시지/도구 설정이 같으면 같은 키 (요청 병합용)"""
+    payload = {
+        "model": model,
+        "messages": [
+            [m.type, m.content, getattr(m, "tool_calls", None), m.additional_kwargs]
+            for m in messages
+        ],
+        "stop": stop,
+        "kwargs": kwargs,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# 프로세스 전체가 공유하는 관문 (환경변수로 조정)
+GATE = RequestGate(
+    rpm=float(os.environ.get("GEMINI_RPM", 60)),
+    burst=float(os.environ.get("GEMINI_BURST", 10)),
+    max_retries=int(os.environ.get("GEMINI_MAX_RETRIES", 4)),
+)
+
+
+class GatedChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    모든 생성 호출을 GATE를 거쳐 보내는 ChatGoogleGenerativeAI (bind_tools 등 기존 기능 그대로 사용)
+
+    gRPC 비동기 클라이언트는 처음 만든 이벤트 루프에 묶이는데, Streamlit은 요청마다 asyncio.run()으로
+    새 루프를 만들므로 인스턴스 하나를 공유하면 두 번째 요청부터 'Event loop is closed'가 납니다.
+    그래서 비동기 클라이언트는 이벤트 루프별로 따로 만들고, 닫힌 루프의 클라이언트는 버립니다.
+    """
+
+    _loop_clients: Dict[asyncio.AbstractEventLoop, Any] = PrivateAttr(default_factory=dict)
+    _loop_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def async_client(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return super().async_client
+        with self._loop_lock:
+            # 클라이언트가 루프를 참조하므로 약한 참조로는 정리되지 않음 → 닫힌 루프는 직접 제거
+            for closed in [l for l in self._loop_clients if l.is_closed()]:
+                del self._loop_clients[closed]
+            client = self._loop_clients.get(loop)
+            if client is None:
+                # 부모 구현은 async_client_running이 비어 있을 때만 새로 만듦 → 현재 루프용으로 새로 생성
+                self.async_client_running = None
+                client = super().async_client
+                self._loop_clients[loop] = client
+            self.async_client_running = client
+            return client
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        parent = super(GatedChatGoogleGenerativeAI, self)._generate
+        key = request_key(self.model, messages, stop, kwargs)
+        return GATE.run_sync(key, lambda: parent(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = request_key(self.model, messages, stop, kwargs)
+        if self.transport == "rest":
+            # REST transport는 비동기 클라이언트를 지원하지 않으므로 동기 호출을 스레드에서 실행
+            parent_sync = super(GatedChatGoogleGenerativeAI, self)._generate
+            return await GATE.run(key, lambda: asyncio.to_thread(parent_sync, messages, stop=stop, **kwargs))
+        parent = super(GatedChatGoogleGenerativeAI, self)._agenerate
+        return await GATE.run(key, lambda: parent(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+
+def load_api_key() -> str:
+    """Streamlit 밖(배치 / 오프라인 작업)에서 환경 변수 또는 .streamlit/secrets.toml의 GOOGLE_API_KEY 조회"""
+    if os.environ.get("GOOGLE_API_KEY"):
+        return os.environ["GOOGLE_API_KEY"]
+    with open(Path(".streamlit") / "secrets.toml", "rb") as f:
+        return tomllib.load(f)["GOOGLE_API_KEY"]
+
+
+def create_llm(google_api_key: str, temperature: float = 0.1) -> ChatGoogleGenerativeAI:
+    """
+    공용 Gemini 클라이언트 생성.
+    GEMINI_API_ENDPOINT를 지정하면 REST transport로 해당 주소(예: 로컬 가짜 모델 서버)에 연결합니다.
+    """
+    options: Dict[str, Any] = {}
+    endpoint = os.environ.get("GEMINI_API_ENDPOINT")
+    if endpoint:
+        options = {"transport": "rest", "client_options": {"api_endpoint": endpoint}}
+
+    return GatedChatGoogleGenerativeAI(
+        model=MODEL_NAME,
+        google_api_key=google_api_key,
+        temperature=temperature,
+        **options
+    )
@@ -1,8 +1,18 @@
-import pandas as pd
 import logging
+import threading
+import time
 from pathlib import Path
 from fastmcp.server import FastMCP, Context
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+# pandas/numpy 기반 모듈은 데이터 로드 시점에 import (서버 핸드셰이크를 막지 않도록)
+if TYPE_CHECKING:
+    import pandas as pd
+    import geo
+    import numpy as np
+    import prescriptions
+    import risk_model
+    import shared_data
 
 # 로깅 설정
 logging.basicConfig(
@@ -16,7 +26,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # 전역 데이터 저장
-DF: Optional[pd.DataFrame] = None
+DF: Optional["pd.DataFrame"] = None
+ID_INDEX: Optional["shared_data.SharedIndex"] = None
+COLUMNS: List[str] = []  # CSV 원래 컬럼 순서 (DF는 dtype별로 묶인 순서)
+GEO_INDEX: Optional["geo.GridIndex"] = None
+TEMPLATES: Optional["prescriptions.TemplateIndex"] = None
+RISK_MODEL: Optional["risk_model.RiskSurrogate"] = None
+RISK_SCORES: Optional["np.ndarray"] = None  # 전체 가맹점의 대리 모델 예측 위험지수백분위
+
+# 가맹점 데이터 CSV
+DATA_PATH = "./data/df_ver2_with_shap.csv"
+
+# 데이터 로드 상태 (준비 상태 프로브용)
+_LOAD_LOCK = threading.Lock()
+_READY = threading.Event()
 
 # MCP 서버 초기화
 mcp = FastMCP(
@@ -37,12 +60,92 @@ mcp = FastMCP(
 
 # 데이터 로드 함수
 def _load_df():
-    global DF
-    DF = pd.read_csv("./data/df_ver2_with_shap.csv")
+    """숫자형 컬럼과 가맹점ID 인덱스는 워커 간 공유 세그먼트(memmap)에 읽기 전용으로 붙습니다."""
+    global DF, ID_INDEX, COLUMNS
+    import shared_data
+
+    DF, ID_INDEX, COLUMNS = shared_data.attach(DATA_PATH)
     return DF
 
-# 서버 시작 시 데이터 로드
-_load_df()
+def _row(df: "pd.DataFrame", i: int) -> Dict[str, Any]:
+    """i번째 행을 CSV 원래 컬럼 순서의 dict로"""
+    row = df.iloc[i].to_dict()
+    return {col: row[col] for col in COLUMNS}
+
+def _select_by_id(merchant_id: str) -> "pd.DataFrame":
+    """가맹점ID 정확 일치 행 조회 (공유 정렬 인덱스 사용, 전체 스캔 없음)"""
+    assert DF is not None and ID_INDEX is not None, "DataFrame이 초기화되지 않았습니다."
+    return DF.iloc[ID_INDEX.positions(str(merchant_id))]
+
+def _load_geo():
+    """로컬 좌표 테이블로 가맹점 주소를 지오코딩한 반경 검색용 격자 인덱스에 붙습니다 (워커 간 공유 세그먼트)."""
+    global GEO_INDEX
+    import geo
+
+    assert DF is not None, "DataFrame이 초기화되지 않았습니다."
+    GEO_INDEX = geo.load_index(DF, DATA_PATH)
+    return GEO_INDEX
+
+def _load_templates():
+    """(업종, SHAP 요인, 부호)별 사전 생성 처방전 템플릿을 불러옵니다."""
+    global TEMPLATES
+    import prescriptions
+
+    TEMPLATES = prescriptions.load_index()
+    return TEMPLATES
+
+def _load_risk_model():
+    """위험지수백분위 대리 모델 계수를 불러오고, 비교 집단 재순위용으로 전체 가맹점 예측값을 미리 계산합니다."""
+    global RISK_MODEL, RISK_SCORES
+    import risk_model
+
+    assert DF is not None, "DataFrame이 초기화되지 않았습니다."
+    model = risk_model.load()
+    if model is not None:
+        # 예측값까지 계산된 뒤에만 공개 (컬럼 불일치 등으로 실패하면 None 유지)
+        RISK_SCORES = model.predict(risk_model.raw_matrix(DF, model.columns))
+        RISK_MODEL = model
+    return RISK_MODEL
+
+def _load_optional(loader, name: str):
+    """부가 기능 데이터 로드. 실패해도 해당 기능만 끄고(전역 None 유지) 나머지 툴은 계속 동작합니다."""
+    try:
+        loader()
+    except Exception as e:
+        logger.error(f"{name} 로드 실패 - 해당 기능을 사용할 수 없습니다: {e!r}")
+
+def ensure_loaded():
+    """
+    데이터가 아직 없으면 로드합니다. 프리로드 스레드가 로드 중이면 끝날 때까지 기다립니다.
+    가맹점 데이터만 필수이고, 좌표 인덱스 / 처방전 템플릿 / 위험도 모델은 실패하면 해당 툴만 found=False를 반환합니다.
+    """
+    if _READY.is_set():
+        return
+    with _LOAD_LOCK:
+        if _READY.is_set():
+            return
+        started = time.perf_counter()
+        _load_df()
+        _load_optional(_load_geo, "좌표 인덱스")
+        _load_optional(_load_templates, "처방전 템플릿")
+        _load_optional(_load_risk_model, "위험도 대리 모델")
+        _READY.set()
+        logger.info(f"데이터 로드 완료 - {time.perf_counter() - started:.2f}초, rows={len(DF)}")
+
+def start_preload():
+    """서버 시작 직후 백그라운드에서 데이터를 미리 로드 (실패하면 첫 툴 호출에서 다시 시도)"""
+    def _preload():
+        try:
+            ensure_loaded()
+        except Exception as e:
+            logger.error(f"데이터 프리로드 실패: {e!r}")
+
+    threading.Thread(target=_preload, name="data-preload", daemon=True).start()
+
+@mcp.resource("status://ready")
+def ready() -> Dict[str, Any]:
+    """데이터 로드 완료 여부 (준비 상태 프로브)"""
+    return {"ready": _READY.is_set(), "rows": len(DF) if _READY.is_set() else 0}
 
 @mcp.tool()
 def search_merchant(merchant_name: str) -> Dict[str, Any]:
@@ -57,7 +160,7 @@ def search_merchant(merchant_name: str) -> Dict[str, Any]:
     """
     logger.info(f"search_merchant 함수 실행 시작 - 입력된 가맹점명: '{merchant_name}'")
     
-    assert DF is not None, "DataFrame이 초기화되지 않았습니다."
+    ensure_loaded()
 
     # 가맹점명 마스킹처리
     original_name = merchant_name
@@ -112,10 +215,10 @@ def get_merchant_detail(merchant_id: str) -> Dict[str, Any]:
       }
     """
     logger.info(f"get_merchant_detail 시작 - Merchant ID={merchant_id!r}")
-    assert DF is not None, "DataFrame이 초기화되지 않았습니다."
+    ensure_loaded()
 
     # 가맹점 ID 기준 검색 (정확 매칭)
-    sel = DF[DF["가맹점ID"].astype(str) == merchant_id]
+    sel = _select_by_id(merchant_id)
 
     if len(sel) == 0:
         logger.warning(f"{merchant_id!r} 결과 없음")
@@ -127,7 +230,10 @@ def get_merchant_detail(merchant_id: str) -> Dict[str, Any]:
         }
 
     # Merchant ID는 유일하다고 가정 → 첫 번째 row만 반환
-    detail = sel.iloc[0].to_dict()
+    import buckets
+
+    # 구간형 컬럼은 int8 코드로 저장되어 있으므로 라벨로 되돌려 반환
+    detail = buckets.decode_record(_row(sel, 0))
     logger.info(f"get_merchant_detail 성공 - {merchant_id!r}")
 
     return {
@@ -137,32 +243,34 @@ def get_merchant_detail(merchant_id: str) -> Dict[str, Any]:
         "message": f"{merchant_id} 의 가맹점 상세정보를 찾았습니다."
     }
 
-def _get_metric_columns(df: pd.DataFrame) -> List[str]:
-    """비교 지표로 쓸 컬럼만 자동 추출"""
+def _get_metric_columns(columns: List[str]) -> List[str]:
+    """비교 지표로 쓸 컬럼만 자동 추출 (CSV 원래 순서)"""
     exclude_cols = {
         "가맹점ID", "기준년월", "주소", "가맹점명",
         "브랜드코드", "지역", "업종", "상권",
         "개설일", "폐업일"
     }
-    return [col for col in df.columns if col not in exclude_cols]
+    return [col for col in columns if col not in exclude_cols]
 
 @mcp.tool()
 def get_compare_industry(merchant_id: str) -> Dict[str, Any]:
     """
     동일 업종 기준으로 비교 지표를 반환하는 MCP Tool
     """
-    assert DF is not None, "DataFrame이 초기화되지 않았습니다."
-    key = "가맹점ID"
+    import pandas as pd
+    import buckets
+
+    ensure_loaded()
 
     logger.info(f"[get_compare_industry] 시작 - merchant_id={merchant_id!r}")
 
     # 대상 추출
-    sel = DF[DF[key].astype(str) == str(merchant_id)]
+    sel = _select_by_id(merchant_id)
     if len(sel) == 0:
         logger.warning(f"[get_compare_industry] {merchant_id!r} 데이터 없음")
         return {"found": False, "message": f"{merchant_id} 데이터 없음"}
 
-    target = sel.iloc[0].to_dict()
+    target = _row(sel, 0)
     industry = target.get("업종")
     logger.info(f"[get_compare_industry] 대상 가맹점명={target.get('가맹점명')}, 업종={industry}")
 
@@ -179,13 +287,18 @@ def get_compare_industry(merchant_id: str) -> Dict[str, Any]:
         return {"found": False, "message": f"{industry} 업종 데이터 없음"}
 
     # 자동 추출된 지표
-    metrics = _get_metric_columns(DF)
+    metrics = _get_metric_columns(COLUMNS)
     logger.info(f"[get_compare_industry] 추출된 지표 컬럼 수={len(metrics)}, 예시={metrics[:5]}")
 
     # 업계 평균 계산
     avg_data = {}
     for m in metrics:
         try:
+            if m in buckets.BUCKET_COLUMNS:
+                # 구간형 컬럼: 서열 코드로 중앙값/분위/분포 계산
+                avg_data[m] = buckets.peer_stats(peers[m], target.get(m))
+                logger.debug(f"[get_compare_industry] {m} 구간 통계={avg_data[m]}")
+                continue
             vals = pd.to_numeric(peers[m], errors="coerce")
             if vals.notna().any():
                 avg = round(vals.mean(), 2)
@@ -206,7 +319,7 @@ def get_compare_industry(merchant_id: str) -> Dict[str, Any]:
         "merchant_id": merchant_id,
         "industry": industry,
         "metrics": metrics,
-        "target": {m: target.get(m) for m in metrics},
+        "target": buckets.decode_record({m: target.get(m) for m in metrics}),
         "industry_peers": {
             "count": int(len(peers)),
             "avg": avg_data
@@ -226,17 +339,19 @@ def my_street_risk(merchant_id: str) -> Dict[str, Any]:
     반환값:
       - 상권 위험도 분석 결과가 담긴 딕셔너리
     """
+    import pandas as pd
+
     logger.info(f"[my_street_risk] 시작 - merchant_id={merchant_id!r}")
-    assert DF is not None, "DataFrame이 초기화되지 않았습니다."
+    ensure_loaded()
 
     # 1. 분석 대상 가맹점 정보 조회
-    target_merchant_df = DF[DF["가맹점ID"].astype(str) == merchant_id]
+    target_merchant_df = _select_by_id(merchant_id)
     if len(target_merchant_df) == 0:
         message = f"{merchant_id}에 해당하는 가맹점을 찾을 수 없습니다."
         logger.warning(f"[my_street_risk] {message}")
         return {"found": False, "message": message}
 
-    target_merchant = target_merchant_df.iloc[0].to_dict()
+    target_merchant = _row(target_merchant_df, 0)
     commercial_district = target_merchant.get("상권")
     
     if not commercial_district:
@@ -292,5 +407,282 @@ def my_street_risk(merchant_id: str) -> Dict[str, Any]:
     logger.info(f"[my_street_risk] 완료 - merchant_id={merchant_id!r}")
     return result
 
+@mcp.tool()
+def nearby_competitors(merchant_id: str, radius_m: float = 500.0) -> Dict[str, Any]:
+    """
+    가맹점 ID를 기준으로 반경 radius_m 미터 안에 있는 같은 업종 경쟁 가맹점과 위험도 통계를 반환합니다.
+    상권 라벨과 무관하게 실제 거리로 비교 집단을 만들므로, 상권 경계에 있거나 상권 정보가 없는 가맹점에도 사용할 수 있습니다.
+    반환되는 '위험지수백분위' 값은 수치가 낮을수록 위험도가 높음을 의미합니다.
+
+    매개변수:
+      - merchant_id: 분석할 가맹점의 ID (예: "000F03E44A")
+      - radius_m: 검색 반경 (미터, 기본 500, 최대 5000)
+
+    반환값:
+      - 반경 내 경쟁 가맹점 분석 결과가 담긴 딕셔너리
+    """
+    import pandas as pd
+    import geo
+
+    logger.info(f"[nearby_competitors] 시작 - merchant_id={merchant_id!r}, radius_m={radius_m}")
+    ensure_loaded()
+
+    if GEO_INDEX is None:
+        message = "좌표 테이블이 없어 반경 검색을 사용할 수 없습니다."
+        logger.warning(f"[nearby_competitors] {message}")
+        return {"found": False, "message": message}
+
+    if not 0 < radius_m <= geo.MAX_RADIUS_M:
+        message = f"검색 반경은 0보다 크고 {geo.MAX_RADIUS_M:g}m 이하여야 합니다: {radius_m!r}"
+        logger.warning(f"[nearby_competitors] {message}")
+        return {"found": False, "message": message}
+
+    # 1. 분석 대상 가맹점 조회
+    positions = ID_INDEX.positions(merchant_id)
+    if len(positions) == 0:
+        message = f"{merchant_id}에 해당하는 가맹점을 찾을 수 없습니다."
+        logger.warning(f"[nearby_competitors] {message}")
+        return {"found": False, "message": message}
+
+    pos = int(positions[0])
+    target_merchant = _row(DF, pos)
+    industry = target_merchant.get("업종")
+    lat, lon = GEO_INDEX.lat[pos], GEO_INDEX.lon[pos]
+    if pd.isna(lat) or pd.isna(lon):
+        message = f"{merchant_id} 가맹점의 주소 좌표를 찾을 수 없습니다."
+        logger.warning(f"[nearby_competitors] {message}")
+        return {"found": False, "message": message}
+
+    # 2. 반경 내 같은 업종 가맹점 (자기 자신 제외)
+    rows, distances = GEO_INDEX.query(lat, lon, radius_m)
+    same = (DF["업종"].to_numpy()[rows] == industry) & (rows != pos)
+    rows, distances = rows[same], distances[same]
+    peers = DF.iloc[rows]
+    logger.info(f"[nearby_competitors] 업종='{industry}', 반경 {radius_m}m 내 경쟁 가맹점 수: {len(peers)}")
+
+    # 3. 위험도 통계
+    risk_percentiles = pd.to_numeric(peers["위험지수백분위"], errors="coerce")
+    avg_risk_percentile = round(risk_percentiles.mean(), 2) if risk_percentiles.notna().any() else None
+    grade_distribution = peers["최종 등급"].value_counts().to_dict()
+
+    competitors = peers[["가맹점ID", "가맹점명", "상권", "위험지수백분위", "최종 등급"]].assign(
+        distance_m=distances.round(1)
+    ).head(20)
+
+    result = {
+        "found": True,
+        "merchant_id": merchant_id,
+        "industry": industry,
+        "radius_m": radius_m,
+        "competitor_analysis": {
+            "peer_count": int(len(peers)),
+            "average_risk_percentile": avg_risk_percentile,
+            "grade_distribution": grade_distribution,
+            "nearest": competitors.to_dict(orient="records")
+        },
+        "target_analysis": {
+            "risk_percentile": target_merchant.get("위험지수백분위"),
+            "final_grade": target_merchant.get("최종 등급")
+        },
+        "message": f"반경 {radius_m}m 내 '{industry}' 업종 경쟁 가맹점 분석이 완료되었습니다."
+    }
+
+    logger.info(f"[nearby_competitors] 완료 - merchant_id={merchant_id!r}")
+    return result
+
+@mcp.tool()
+def get_prescription_templates(merchant_id: str) -> Dict[str, Any]:
+    """
+    가맹점의 업종과 위험도 상위 3가지 요인(shaptop1~3)의 부호 조합에 맞는 사전 생성 처방전 템플릿을 반환합니다.
+    맞춤 처방전이나 문제 해결 처방전을 작성할 때 먼저 이 도구로 템플릿을 받고,
+    새로 작성하지 말고 가맹점의 실제 데이터 수치에 맞게 개인화하세요.
+    SHAP 부호: '+' = 위험도를 높이는 약점(보완 전략), '-' = 위험도를 낮추는 강점(강화 전략)
+
+    매개변수:
+      - merchant_id: 가맹점 ID (예: "000F03E44A")
+
+    반환값:
+      - 요인별 템플릿 목록이 담긴 딕셔너리 (source: '업종' = 같은 업종용, '공통' = 업종 무관)
+    """
+    import prescriptions
+
+    logger.info(f"[get_prescription_templates] 시작 - merchant_id={merchant_id!r}")
+    ensure_loaded()
+
+    if TEMPLATES is None:
+        message = "사전 생성된 처방전 템플릿이 없습니다."
+        logger.warning(f"[get_prescription_templates] {message}")
+        return {"found": False, "message": message}
+
+    sel = _select_by_id(merchant_id)
+    if len(sel) == 0:
+        message = f"{merchant_id}에 해당하는 가맹점을 찾을 수 없습니다."
+        logger.warning(f"[get_prescription_templates] {message}")
+        return {"found": False, "message": message}
+
+    target = _row(sel, 0)
+    industry = target.get("업종")
+
+    factors = []
+    for rank, factor, value in prescriptions.shap_factors(target):
+        sign = prescriptions.sign_of(value)
+        entry = TEMPLATES.lookup(industry, factor, sign)
+        factors.append({
+            "rank": rank,
+            "factor": factor,
+            "shap_value": value,
+            "sign": sign,
+            "source": entry["source"] if entry else None,
+            "templates": entry["items"] if entry else []
+        })
+
+    hits = sum(1 for f in factors if f["templates"])
+    logger.info(f"[get_prescription_templates] 완료 - 업종='{industry}', 템플릿 있는 요인 {hits}/{len(factors)}")
+    return {
+        "found": hits > 0,
+        "merchant_id": merchant_id,
+        "industry": industry,
+        "factors": factors,
+        "message": f"요인 {len(factors)}개 중 {hits}개의 처방전 템플릿을 찾았습니다."
+    }
+
+@mcp.tool()
+def simulate_risk(merchant_id: str, changes: Dict[str, Any], peer_group: str = "업종", steps: int = 11) -> Dict[str, Any]:
+    """
+    가맹점 지표를 바꿨을 때 위험지수백분위가 어떻게 달라지는지 시뮬레이션합니다 (what-if 분석).
+    오프라인으로 학습한 대리 모델로 지표 변화 조합(시나리오 격자)을 한 번에 평가하고,
+    같은 업종 또는 상권 가맹점들 사이에서 몇 % 위치가 되는지 다시 순위를 매깁니다.
+    '위험지수백분위'는 수치가 낮을수록 위험도가 높음을 의미합니다.
+
+    매개변수:
+      - merchant_id: 가맹점 ID (예: "000F03E44A")
+      - changes: 지표별 변화량. 지표명은 shaptop 요인명 또는 컬럼명 (예: "재방문_고객_비중" 또는 "재방문 고객 비중").
+          - 숫자 하나: 0부터 그 값까지 steps 단계로 나눠 시뮬레이션 (예: {"재방문 고객 비중": 10} = 0, 1, ..., 10%p 증가)
+          - 숫자 목록: 해당 변화량들을 그대로 사용 (예: {"배달 매출 비율": [-10, 0, 10]})
+          - 구간형 지표(예: 매출건수 구간)는 정수 구간 단계 단위이며, 음수일수록 상위 구간으로 이동 (결과 값은 구간 라벨)
+      - peer_group: 재순위 비교 집단, "업종" 또는 "상권" (기본 "업종")
+      - steps: 숫자 하나로 준 변화량을 나눌 단계 수 (기본 11, 2 이상)
+
+    반환값:
+      - 현재 예측값, 요청한 변화를 모두 적용한 결과, 위험지수백분위가 가장 높은 시나리오 상위 10개가 담긴 딕셔너리
+      - delta는 변화 전 출발점 예측값 기준이며, 값이 없던 지표(imputed_metrics)는 전체 중앙값에서 출발합니다.
+    """
+    import numpy as np
+    import buckets
+    import risk_model
+
+    logger.info(f"[simulate_risk] 시작 - merchant_id={merchant_id!r}, changes={changes}, peer_group={peer_group!r}")
+    ensure_loaded()
+    started = time.perf_counter()
+
+    if RISK_MODEL is None:
+        message = "위험도 대리 모델이 없어 시뮬레이션을 사용할 수 없습니다."
+        logger.warning(f"[simulate_risk] {message}")
+        return {"found": False, "message": message}
+
+    if peer_group not in ("업종", "상권"):
+        message = f"peer_group은 '업종' 또는 '상권'이어야 합니다: {peer_group!r}"
+        logger.warning(f"[simulate_risk] {message}")
+        return {"found": False, "message": message}
+
+    positions = ID_INDEX.positions(merchant_id)
+    if len(positions) == 0:
+        message = f"{merchant_id}에 해당하는 가맹점을 찾을 수 없습니다."
+        logger.warning(f"[simulate_risk] {message}")
+        return {"found": False, "message": message}
+    pos = int(positions[0])
+    target_merchant = _row(DF, pos)
+
+    # 1. 변화량 해석: 지표명 → (모델 열 번호, 변화량 목록)
+    if not isinstance(changes, dict):
+        message = f"changes는 지표명 → 변화량 딕셔너리여야 합니다: {changes!r}"
+        logger.warning(f"[simulate_risk] {message}")
+        return {"found": False, "message": message}
+    try:
+        grid = risk_model.change_grid(RISK_MODEL, changes, steps)
+    except ValueError as e:
+        message = str(e)
+        logger.warning(f"[simulate_risk] {message}")
+        return {"found": False, "message": message}
+
+    # 2. 시나리오 격자를 한 번에 예측
+    base = risk_model.raw_matrix(DF.iloc[[pos]], RISK_MODEL.columns)[0]
+    X, missing = RISK_MODEL.scenario_grid(base, grid)
+    scores = RISK_MODEL.predict(X, missing)
+    baseline_score = float(RISK_SCORES[pos])
+
+    # 변화량 기준점: 결측 지표를 출발값으로 채우고 결측 표시 항은 그대로 둔 예측값 (변화 0이면 delta 0)
+    start = RISK_MODEL.start_point(base)
+    reference_score = float(RISK_MODEL.predict(start[None, :], np.isnan(base)[None, :])[0])
+
+    # 3. 비교 집단 예측값 분포에서 재순위 (같은 모델 기준이라 모델 오차가 상쇄됨)
+    group_value = target_merchant.get(peer_group)
+    peer_mask = (DF[peer_group].to_numpy() == group_value) & (np.arange(len(DF)) != pos)
+    peer_scores = np.sort(RISK_SCORES[peer_mask])
+
+    def peer_percentile(values: "np.ndarray") -> "np.ndarray":
+        """비교 집단 중 이 점수 이하인 가맹점 비율(%) - 높을수록 집단 내 안전한 편"""
+        if len(peer_scores) == 0:
+            return np.full(len(values), np.nan)
+        return np.searchsorted(peer_scores, values, side="right") / len(peer_scores) * 100
+
+    percentiles = peer_percentile(scores)
+    baseline_percentile = float(peer_percentile(np.array([baseline_score]))[0])
+
+    # 적용된 변화량 = 시나리오 값 - 출발값 (결측 지표는 중앙값에서 출발, 범위 제한 반영)
+    idx = list(grid)
+    columns = [RISK_MODEL.columns[j] for j in idx]
+    imputed = [RISK_MODEL.columns[j] for j in idx if np.isnan(base[j])]
+
+    def change(j: int, x: float) -> Any:
+        """구간형 지표는 정수 구간 단계로, 나머지는 원 단위 수치로"""
+        return int(round(x - start[j])) if RISK_MODEL.is_bucket(j) else round(float(x - start[j]), 3)
+
+    def value(j: int, x: float) -> Any:
+        """구간형 지표는 라벨로, 나머지는 원 단위 수치로"""
+        return buckets.decode(int(round(x))) if RISK_MODEL.is_bucket(j) else round(float(x), 3)
+
+    def scenario(i: int) -> Dict[str, Any]:
+        return {
+            "changes": {col: change(j, X[i, j]) for col, j in zip(columns, idx)},
+            "values": {col: value(j, X[i, j]) for col, j in zip(columns, idx)},
+            "predicted_risk_percentile": round(float(scores[i]), 2),
+            "delta": round(float(scores[i] - reference_score), 2),
+            "peer_percentile": round(float(percentiles[i]), 1)
+        }
+
+    # 요청한 변화(각 목록의 마지막 값)를 모두 적용한 시나리오 = 격자의 마지막 행
+    top = np.argsort(-scores, kind="stable")[:10]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    result = {
+        "found": True,
+        "merchant_id": merchant_id,
+        "peer_group": peer_group,
+        "peer_group_value": group_value,
+        "peer_count": int(len(peer_scores)),
+        "baseline": {
+            "risk_percentile": target_merchant.get("위험지수백분위"),
+            "predicted_risk_percentile": round(baseline_score, 2),
+            "reference_predicted_risk_percentile": round(reference_score, 2),
+            "peer_percentile": round(baseline_percentile, 1)
+        },
+        "requested": scenario(len(scores) - 1),
+        "imputed_metrics": imputed,
+        "best_scenarios": [scenario(int(i)) for i in top],
+        "scenario_count": int(len(scores)),
+        "model": {
+            "holdout_r2": RISK_MODEL.model["holdout_r2"],
+            "note": "대리 모델 추정값이며 실제 위험지수와 차이가 있을 수 있습니다. 변화 후 값은 학습 데이터 범위로 제한되며, "
+                    "imputed_metrics의 지표는 값이 없어 전체 중앙값에서 출발했으며 delta는 그 출발점 기준입니다."
+        },
+        "elapsed_ms": round(elapsed_ms, 2),
+        "message": f"{len(scores)}개 시나리오의 위험도 시뮬레이션이 완료되었습니다."
+    }
+
+    logger.info(f"[simulate_risk] 완료 - 시나리오 {len(scores)}개, {elapsed_ms:.1f}ms")
+    return result
+
 if __name__ == "__main__":
+    start_preload()
     mcp.run()
\ No newline at end of file
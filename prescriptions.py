@@ -0,0 +1,235 @@
+"""
+(업종, SHAP 요인, 부호) 조합별 처방전 템플릿 사전 생성 / 조회
+
+데이터에서 자주 나오는 조합마다 Gemini로 처방 템플릿을 한 번만 만들어 JSON으로 저장하고,
+MCP 툴(get_prescription_templates)이 이를 조회해 모델은 개인화만 하도록 합니다.
+업종별 조합 외에 업종 무관('*') 조합도 함께 만들어, 드문 업종은 공통 템플릿으로 대체합니다.
+
+사용 예 (오프라인 생성, 중단 후 다시 실행하면 이미 만든 조합은 건너뜀):
+    uv run prescriptions.py --min-count 5 --concurrency 4
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FILE = Path(os.environ.get("PRESCRIPTION_TEMPLATES", "./data/prescription_templates.json"))
+ANY_INDUSTRY = "*"
+SHAP_RANKS = (1, 2, 3)
+
+
+def sign_of(value: float) -> str:
+    """SHAP 값 부호: '+' = 위험도를 높이는 약점, '-' = 위험도를 낮추는 강점"""
+    return "+" if value > 0 else "-"
+
+
+def factor_label(factor: str) -> str:
+    """'매출건수_구간_ord' → '매출건수 구간'"""
+    return factor.removesuffix("_ord").replace("_", " ")
+
+
+def template_key(industry: str, factor: str, sign: str) -> str:
+    return f"{industry}|{factor}|{sign}"
+
+
+def shap_factors(row: Dict[str, Any]) -> List[Tuple[int, str, float]]:
+    """가맹점 row에서 (순위, 요인, SHAP 값) 목록 추출"""
+    factors = []
+    for rank in SHAP_RANKS:
+        factor, value = row.get(f"shaptop{rank}"), row.get(f"shaptop{rank}_value")
+        if isinstance(factor, str) and value is not None and not pd.isna(value):
+            factors.append((rank, factor, float(value)))
+    return factors
+
+
+def frequent_triples(df: pd.DataFrame, min_count: int) -> List[Dict[str, Any]]:
+    """데이터에서 min_count번 이상 나온 (업종, 요인, 부호) 조합과 업종 무관 (요인, 부호) 조합"""
+    parts = [
+        df[["업종", f"shaptop{rank}", f"shaptop{rank}_value"]].set_axis(["industry", "factor", "value"], axis=1)
+        for rank in SHAP_RANKS
+    ]
+    melted = pd.concat(parts).dropna()
+    melted["sign"] = melted["value"].map(sign_of)
+
+    by_industry = melted.groupby(["industry", "factor", "sign"]).size()
+    overall = melted.groupby(["factor", "sign"]).size()
+
+    triples = [
+        {"industry": ANY_INDUSTRY, "factor": factor, "sign": sign, "count": int(count)}
+        for (factor, sign), count in overall.items()
+    ]
+    triples += [
+        {"industry": industry, "factor": factor, "sign": sign, "count": int(count)}
+        for (industry, factor, sign), count in by_industry[by_industry >= min_count].items()
+    ]
+    return sorted(triples, key=lambda t: -t["count"])
+
+
+class TemplateIndex:
+    """(업종, 요인, 부호) → 처방전 템플릿 조회 (업종 조합이 없으면 업종 무관 템플릿으로 대체)"""
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]]):
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, industry: str, factor: str, sign: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(template_key(industry, factor, sign))
+        if entry is not None:
+            return {"source": "업종", **entry}
+        entry = self.entries.get(template_key(ANY_INDUSTRY, factor, sign))
+        if entry is not None:
+            return {"source": "공통", **entry}
+        return None
+
+
+def _read_store(path: Path) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["templates"]
+
+
+def _write_store(path: Path, entries: Dict[str, Dict[str, Any]]):
+    """임시 파일에 쓴 뒤 교체 (중간에 중단되어도 파일이 깨지지 않음)"""
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "templates": entries}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def load_index(path: Path = TEMPLATE_FILE) -> Optional[TemplateIndex]:
+    """저장된 템플릿 파일을 읽어 조회 인덱스 생성. 파일이 없으면 None."""
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"[prescriptions] 템플릿 파일 없음 - {path}")
+        return None
+    index = TemplateIndex(_read_store(path))
+    logger.info(f"[prescriptions] 템플릿 로드 - {len(index)}개 조합")
+    return index
+
+
+def _generation_prompt(industry: str, factor: str, sign: str) -> str:
+    target = "업종과 무관하게 모든" if industry == ANY_INDUSTRY else f"'{industry}' 업종"
+    meaning = (
+        "위험도를 높이는 약점이므로 이를 보완하는 전략"
+        if sign == "+" else
+        "위험도를 낮추는 강점이므로 이를 더 강화하는 전략"
+    )
+    return f"""당신은 소상공인 마케팅 컨설턴트입니다.
+{target} 가맹점 중, 폐업 위험도 모델에서 '{factor_label(factor)}' 요인의 SHAP 값이 {sign} 인 가게들이 있습니다.
+이 요인은 {meaning}이 필요합니다.
+
+이 조합의 가게들에 공통으로 적용할 수 있는 마케팅 처방 템플릿 3개를 JSON 배열로만 출력하세요.
+각 원소 형식:
+{{"title": "처방명", "subscription": "구체적인 실행 방안 (가게별 정보는 [가맹점명], [현재 수치] 같은 자리표시자 사용)", "basis_hint": "가게별 근거를 쓸 때 인용할 데이터 지표"}}
+
+규칙:
+1. JSON 이외의 설명, 코드블록, 주석은 출력하지 않는다.
+2. 구간을 나타낼 때는 '~' 대신 '-' 을 사용한다.
+3. 불필요한 강조 (** **) 를 포함하지 않는다."""
+
+
+def _reply_text(content: Any) -> str:
+    """모델 응답 content를 문자열로 (문자열 또는 [{"type": "text", "text": ...}, ...] 조각 목록)"""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type", "text") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def parse_templates(text: str) -> List[Dict[str, Any]]:
+    """템플릿 JSON 배열 파싱 (```json 코드블록 허용). 형식이 맞지 않으면 ValueError."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        text = text.removesuffix("```").strip()
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"템플릿 JSON 파싱 실패: {e}") from e
+    if not isinstance(items, list) or not items:
+        raise ValueError("템플릿은 비어 있지 않은 JSON 배열이어야 합니다.")
+    for item in items:
+        if not isinstance(item, dict) or not item.get("title") or not item.get("subscription"):
+            raise ValueError(f"title / subscription이 없는 템플릿 항목: {item!r}")
+    return items
+
+
+def _generate(llm, triple: Dict[str, Any]) -> Dict[str, Any]:
+    from langchain_core.messages import HumanMessage
+
+    reply = llm.invoke([HumanMessage(content=_generation_prompt(triple["industry"], triple["factor"], triple["sign"]))])
+    text = _reply_text(reply.content)
+    try:
+        items = parse_templates(text)
+    except ValueError as e:
+        raise ValueError(f"{e} - 응답: {text[:200]!r}") from e
+    usage = getattr(reply, "usage_metadata", None) or {}
+    return {**triple, "items": items, "output_tokens": usage.get("output_tokens")}
+
+
+def build(csv_path: str, out: Path, min_count: int, concurrency: int, limit: Optional[int] = None) -> Dict[str, Any]:
+    """빈도 높은 조합부터 템플릿을 생성해 out에 저장 (이미 있는 조합은 건너뜀)"""
+    from llm_client import GATE, create_llm, load_api_key
+
+    triples = frequent_triples(pd.read_csv(csv_path), min_count)
+    entries = _read_store(out)
+    todo = [t for t in triples if template_key(t["industry"], t["factor"], t["sign"]) not in entries]
+    if limit:
+        todo = todo[:limit]
+    logger.info(f"조합 {len(triples)}개 중 생성 완료 {len(triples) - len(todo)}개, 남은 작업 {len(todo)}개")
+
+    llm = create_llm(load_api_key(), temperature=0.3)
+    started = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(_generate, llm, t): t for t in todo}
+        for n, future in enumerate(as_completed(futures), 1):
+            triple = futures[future]
+            key = template_key(triple["industry"], triple["factor"], triple["sign"])
+            try:
+                entries[key] = future.result()
+                _write_store(out, entries)
+            except Exception as e:
+                failed += 1
+                logger.error(f"[{key}] 템플릿 생성 실패: {e!r}")
+            logger.info(f"[{n}/{len(todo)}] {key} - LLM {GATE.metrics()}")
+
+    return {
+        "templates": len(entries),
+        "generated": len(todo) - failed,
+        "failed": failed,
+        "minutes": round((time.perf_counter() - started) / 60, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="(업종, SHAP 요인, 부호) 처방전 템플릿 사전 생성")
+    parser.add_argument("--csv", default="./data/df_ver2_with_shap.csv")
+    parser.add_argument("--out", default=str(TEMPLATE_FILE))
+    parser.add_argument("--min-count", type=int, default=5, help="업종별 조합을 만들 최소 등장 횟수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 생성 수 (속도 제한은 llm_client가 담당)")
+    parser.add_argument("--limit", type=int, help="이번 실행에서 생성할 최대 조합 수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    print(json.dumps(build(args.csv, Path(args.out), args.min_count, args.concurrency, args.limit), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import json
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 진단 리포트 공용 로직: 응답 JSON 섹션 파싱, 근거 텍스트에서 차트 데이터 추출, 차트 생성
+# streamlit_app.py(render_messages)와 batch_report.py가 같은 섹션 레이아웃을 쓰도록 모아 둡니다.
+
+# 섹션 이름
+SECTION_DIAGNOSIS = "🩺 종합 건강 진단"
+SECTION_PRESCRIPTIONS = ("🏥 맞춤 처방전", "🎯 문제 해결 처방전")
+SECTION_BASIC_INFO = "ℹ️ 가맹점 기본 정보"
+
+AGE_GROUPS = ["20대 이하", "30대", "40대", "50대", "60대 이상"]
+
+# 차트 공용 설정 (plotly: 화면용 / matplotlib: 배치 리포트 PNG용)
+USAGE_TITLE = '고객 이용 비율'
+USAGE_LABELS = ['거주 이용 고객', '직장 이용 고객', '유동인구 이용 고객']
+USAGE_COLORS = ['#8cd2f5', '#4baff5', '#2878f5']
+PYRAMID_TITLE = '연령대별 고객 분포'
+PYRAMID_XAXIS = '비율 (%)'
+PYRAMID_YAXIS = '연령대'
+GENDER_COLORS = {'남성': '#00236e', '여성': '#000000'}
+
+# 한글 라벨용 글꼴 후보 (matplotlib, 설치된 첫 글꼴 사용)
+KOREAN_FONTS = ["NanumGothic", "Malgun Gothic", "AppleGothic", "Noto Sans CJK KR", "Noto Sans KR"]
+
+logger = logging.getLogger(__name__)
+
+
+def is_json_response(content: str) -> bool:
+    """모델 응답이 섹션 JSON 형식인지 판단"""
+    return (content.startswith('[') and content.endswith(']')) or \
+           (content.find('[') != -1 and content.find(']') != -1 and
+            content.find('"section"') != -1)
+
+
+def parse_sections(content: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    모델 응답에서 섹션 리스트를 추출합니다. (코드블록이나 추가 텍스트 제거)
+    JSON 형식이 아니거나 파싱에 실패하면 None을 반환합니다.
+    """
+    content = content.strip()
+    if not is_json_response(content):
+        return None
+
+    # JSON 코드블록 제거
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+
+    # 대괄호로 시작하는 JSON 찾기
+    start_idx = content.find('[')
+    end_idx = content.rfind(']')
+
+    if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
+        json_content = content[start_idx:end_idx+1]
+    else:
+        json_content = content
+
+    try:
+        response_data = json.loads(json_content)
+    except (json.JSONDecodeError, ValueError):
+        return None
+
+    if isinstance(response_data, dict):
+        response_data = [response_data]
+    return response_data
+
+
+def extract_usage_ratios(basis: str) -> Optional[Tuple[float, float, float]]:
+    """근거 텍스트에서 거주/직장/유동인구 이용 고객 비율 추출 (없으면 None)"""
+    residence_match = re.search(r'거주.*?(\d+\.?\d*)%', basis)
+    workplace_match = re.search(r'직장.*?(\d+\.?\d*)%', basis)
+    floating_match = re.search(r'유동인구.*?(\d+\.?\d*)%', basis)
+
+    if residence_match and workplace_match and floating_match:
+        return (
+            float(residence_match.group(1)),
+            float(workplace_match.group(1)),
+            float(floating_match.group(1)),
+        )
+    return None
+
+
+def extract_age_gender(basis: str) -> Dict[str, Dict[str, float]]:
+    """근거 텍스트(문장 또는 표 형식)에서 연령대별 남녀 고객 비중 추출"""
+    age_gender_data = {}
+
+    for age in AGE_GROUPS:
+        male_match = re.search(rf'남성 {age}.*?(\d+\.?\d*)%', basis)
+        female_match = re.search(rf'여성 {age}.*?(\d+\.?\d*)%', basis)
+        if male_match and female_match:
+            age_gender_data[age] = {
+                '남성': float(male_match.group(1)),
+                '여성': float(female_match.group(1))
+            }
+
+    # 테이블 형태에서도 데이터 추출 시도
+    if not age_gender_data:
+        table_lines = basis.split('\\n')
+        header_found = False
+
+        for line in table_lines:
+            if '연령대' in line and ('남성' in line or '여성' in line):
+                header_found = True
+                continue
+            if header_found and '|' in line:
+                parts = [part.strip() for part in line.split('|') if part.strip()]
+                if len(parts) >= 3:
+                    age_group = parts[0]
+                    male_val = re.search(r'(\d+\.?\d*)%?', parts[1])
+                    female_val = re.search(r'(\d+\.?\d*)%?', parts[2])
+
+                    if male_val and female_val:
+                        age_gender_data[age_group] = {
+                            '남성': float(male_val.group(1)),
+                            '여성': float(female_val.group(1))
+                        }
+
+    return age_gender_data
+
+def _pyramid_series(age_gender_data) -> Tuple[List[str], List[float], List[float]]:
+    """연령대 목록, 남성 비율, 여성 비율"""
+    age_groups = list(age_gender_data.keys())
+    male_values = [age_gender_data[age].get('남성', 0) for age in age_groups]
+    female_values = [age_gender_data[age].get('여성', 0) for age in age_groups]
+    return age_groups, male_values, female_values
+
+def create_pie_chart(residence_ratio: float, workplace_ratio: float, floating_ratio: float):
+    """고객 이용 비율 원그래프 생성"""
+    import plotly.graph_objects as go  # 차트를 그릴 때만 로드
+
+    # 데이터 준비
+    labels = USAGE_LABELS
+    values = [residence_ratio, workplace_ratio, floating_ratio]
+    colors = USAGE_COLORS
+    
+    # Plotly 파이 차트 생성
+    fig = go.Figure(data=[go.Pie(
+        labels=labels, 
+        values=values,
+        hole=0.3,  # 도넛 차트 스타일
+        marker_colors=colors,
+        textinfo='label+percent',
+        textfont_size=12,
+        showlegend=True
+    )])
+    
+    fig.update_layout(
+        title={
+            'text': USAGE_TITLE,
+            'x': 0.4,
+            'font': {'size': 16}
+        },
+        font=dict(family="Arial", size=12),
+        width=400,
+        height=400,
+        margin=dict(t=50, b=50, l=50, r=50)
+    )
+    
+    return fig
+
+def create_population_pyramid(age_gender_data):
+    import plotly.graph_objects as go  # 차트를 그릴 때만 로드
+
+    age_groups, male_values, female_values = _pyramid_series(age_gender_data)
+    
+    # 남성 데이터는 음수로 변환 (왼쪽에 표시하기 위해)
+    male_values_negative = [-val for val in male_values]
+    
+    fig = go.Figure()
+    
+    # 남성 데이터 (왼쪽, 파란색)
+    fig.add_trace(go.Bar(
+        y=age_groups,
+        x=male_values_negative,
+        name='남성',
+        orientation='h',
+        marker_color=GENDER_COLORS['남성'],
+        text=[f'{val}%' for val in male_values],
+        textposition='inside',
+        textfont=dict(color='white', size=10)
+    ))
+    
+    # 여성 데이터 (오른쪽, 주황색)
+    fig.add_trace(go.Bar(
+        y=age_groups,
+        x=female_values,
+        name='여성',
+        orientation='h',
+        marker_color=GENDER_COLORS['여성'],
+        text=[f'{val}%' for val in female_values],
+        textposition='inside',
+        textfont=dict(color='white', size=10)
+    ))
+    
+    # 최대값 계산 (x축 범위 설정용)
+    max_val = max(max(male_values), max(female_values))
+    
+    fig.update_layout(
+        title={
+            'text': PYRAMID_TITLE,
+            'x': 0.4,
+            'font': {'size': 16}
+        },
+        xaxis=dict(
+            title=PYRAMID_XAXIS,
+            range=[-max_val*1.2, max_val*1.2],
+            tickvals=list(range(-int(max_val), int(max_val)+1, 5)),
+            ticktext=[str(abs(x)) + '%' for x in range(-int(max_val), int(max_val)+1, 5)]
+        ),
+        yaxis=dict(
+            title=PYRAMID_YAXIS,
+            categoryorder='array',
+            categoryarray=age_groups[::-1]  # 위부터 높은 연령대가 오도록
+        ),
+        barmode='overlay',
+        bargap=0.1,
+        height=500,
+        width=600,
+        margin=dict(t=80, b=50, l=80, r=50),
+        font=dict(family="Arial", size=12),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5
+        )
+    )
+    
+    return fig
+
+@lru_cache(maxsize=1)
+def _pyplot():
+    """matplotlib를 화면 없는 Agg 백엔드로 로드하고 한글 글꼴 설정 (프로세스당 한 번)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
+    installed = {f.name for f in font_manager.fontManager.ttflist}
+    fonts = [f for f in KOREAN_FONTS if f in installed]
+    if fonts:
+        plt.rcParams["font.family"] = fonts[0]
+    else:
+        logger.warning(f"한글 글꼴({', '.join(KOREAN_FONTS)})이 없어 차트의 한글 라벨이 깨질 수 있습니다.")
+    plt.rcParams["axes.unicode_minus"] = False
+    return plt
+
+def _save_png(fig, path: Path) -> Path:
+    fig.savefig(path, format="png", dpi=150, bbox_inches="tight")
+    _pyplot().close(fig)
+    return path
+
+def save_pie_chart_png(residence_ratio: float, workplace_ratio: float, floating_ratio: float, path: Path) -> Path:
+    """create_pie_chart와 같은 고객 이용 비율 도넛 차트를 PNG로 저장 (배치 리포트용)"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(4, 4))
+    ax.pie([residence_ratio, workplace_ratio, floating_ratio], labels=USAGE_LABELS, colors=USAGE_COLORS,
+           autopct='%1.1f%%', wedgeprops={"width": 0.7}, textprops={"fontsize": 9})
+    ax.set_title(USAGE_TITLE)
+    return _save_png(fig, path)
+
+def save_population_pyramid_png(age_gender_data, path: Path) -> Path:
+    """create_population_pyramid와 같은 연령대별 성별 분포(남성 왼쪽, 여성 오른쪽)를 PNG로 저장 (배치 리포트용)"""
+    plt = _pyplot()
+    age_groups, male_values, female_values = _pyramid_series(age_gender_data)
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.barh(age_groups, [-v for v in male_values], color=GENDER_COLORS['남성'], label='남성')
+    ax.barh(age_groups, female_values, color=GENDER_COLORS['여성'], label='여성')
+    max_val = max(male_values + female_values + [1])
+    ax.set_xlim(-max_val * 1.2, max_val * 1.2)
+    ax.xaxis.set_major_formatter(lambda x, _: f"{abs(x):g}%")
+    ax.axvline(0, color='gray', linewidth=0.8)
+    ax.invert_yaxis()  # 위부터 목록 순서대로 (create_population_pyramid와 같음)
+    ax.set_xlabel(PYRAMID_XAXIS)
+    ax.set_ylabel(PYRAMID_YAXIS)
+    ax.set_title(PYRAMID_TITLE)
+    ax.legend(loc='lower right')
+    return _save_png(fig, path)
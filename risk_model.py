@@ -0,0 +1,237 @@
+"""
+위험지수백분위 대리(surrogate) 모델: 오프라인 학습 + what-if 시뮬레이션
+
+SHAP 상위 요인으로 등장하는 지표들로 위험지수백분위를 예측하는 작은 모델을 학습해 JSON 계수로 저장합니다.
+모델 형태: 표준화한 지표별 1차 + 2차 항 + 결측 표시 항에 대한 릿지 회귀 (numpy만 사용, 지표당 계수 3개).
+서버는 계수만 읽어 수백 개의 시나리오를 한 번의 행렬 연산으로 평가합니다.
+
+사용 예 (오프라인 학습):
+    uv run risk_model.py
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import buckets
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = Path(os.environ.get("RISK_MODEL", "./data/risk_surrogate.json"))
+TARGET = "위험지수백분위"
+Z_CLIP = 4.0
+MAX_SCENARIOS = 2000
+
+
+def factor_column(name: str) -> str:
+    """SHAP 요인명/컬럼명 → 데이터 컬럼명 ('매출건수_구간_ord' → '매출건수 구간')"""
+    return name.strip().removesuffix("_ord").replace("_", " ")
+
+
+def shap_factor_columns(df: pd.DataFrame) -> List[str]:
+    """데이터에서 SHAP 상위 요인으로 한 번이라도 등장한 지표 컬럼"""
+    factors = pd.concat([df["shaptop1"], df["shaptop2"], df["shaptop3"]]).dropna().unique()
+    return sorted({factor_column(f) for f in factors if factor_column(f) in df.columns})
+
+
+def raw_matrix(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """지표 컬럼을 float 행렬로 (구간형 결측 코드 -1은 NaN)"""
+    X = df[columns].to_numpy(dtype=np.float64, copy=True)
+    for j, col in enumerate(columns):
+        if col in buckets.BUCKET_COLUMNS:
+            X[X[:, j] == buckets.MISSING_CODE, j] = np.nan
+    return X
+
+
+class RiskSurrogate:
+    """저장된 계수로 위험지수백분위를 예측 (높을수록 안전)"""
+
+    def __init__(self, model: Dict[str, Any]):
+        self.model = model
+        self.columns = [f["column"] for f in model["features"]]
+        self.median = np.array([f["median"] for f in model["features"]])
+        self.mean = np.array([f["mean"] for f in model["features"]])
+        self.std = np.array([f["std"] for f in model["features"]])
+        self.low = np.array([f["min"] for f in model["features"]])
+        self.high = np.array([f["max"] for f in model["features"]])
+        self.w_lin = np.array([f["w_lin"] for f in model["features"]])
+        self.w_sq = np.array([f["w_sq"] for f in model["features"]])
+        self.w_miss = np.array([f["w_miss"] for f in model["features"]])
+        self.intercept = model["intercept"]
+        self.y_range = model["target_range"]
+
+    def column_index(self, name: str) -> Optional[int]:
+        col = factor_column(name)
+        return self.columns.index(col) if col in self.columns else None
+
+    def is_bucket(self, j: int) -> bool:
+        """구간형(서열 코드) 지표인지"""
+        return self.columns[j] in buckets.BUCKET_COLUMNS
+
+    def predict(self, X: np.ndarray, missing: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        X: (n, 지표 수) 원 단위 값 (NaN = 결측) → (n,) 예측 위험지수백분위
+        missing을 주면 결측 표시 항은 X 대신 이 마스크를 사용합니다 (결측 지표를 채워 넣은 시나리오에서 결측 항 유지).
+        """
+        nan = np.isnan(X)
+        missing = nan if missing is None else missing | nan
+        Z = np.clip((np.where(nan, self.median, X) - self.mean) / self.std, -Z_CLIP, Z_CLIP)
+        y = self.intercept + Z @ self.w_lin + (Z ** 2) @ self.w_sq + missing @ self.w_miss
+        return np.clip(y, *self.y_range)
+
+    def start_point(self, base: np.ndarray) -> np.ndarray:
+        """시뮬레이션 출발값: 결측 지표는 중앙값 (구간형은 가장 가까운 구간 코드)"""
+        median = np.array([round(m) if self.is_bucket(j) else m for j, m in enumerate(self.median)])
+        return np.where(np.isnan(base), median, base)
+
+    def scenario_grid(self, base: np.ndarray, changes: Dict[int, List[float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        base 행(원 단위)에 지표별 변화량 목록의 모든 조합을 더한 (시나리오 행렬, 결측 표시 마스크).
+        바꾸는 지표가 결측이면 start_point에서 출발하되 결측 표시 항은 base 그대로 유지하므로,
+        변화량 0인 시나리오는 출발점 예측값(predict(start_point(base), base 결측 마스크))과 같습니다.
+        결과는 학습 데이터 범위로 자릅니다.
+        """
+        idx = list(changes)
+        deltas = np.array(list(itertools.product(*(changes[j] for j in idx))), dtype=np.float64)
+        X = np.tile(base, (len(deltas), 1))
+        missing = np.tile(np.isnan(base), (len(deltas), 1))
+        if idx:
+            start = self.start_point(base)[idx]
+            X[:, idx] = np.clip(start + deltas, self.low[idx], self.high[idx])
+        return X, missing
+
+
+def _finite(value: Any, name: str) -> float:
+    """변화량 하나를 유한한 실수로 (bool / 문자열 / None / NaN / inf는 거부)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"'{name}'의 변화량은 유한한 숫자여야 합니다: {value!r}")
+    return float(value)
+
+
+def change_grid(model: RiskSurrogate, changes: Dict[str, Any], steps: int) -> Dict[int, List[float]]:
+    """
+    simulate_risk 입력(지표명 → 숫자 또는 숫자 목록)을 모델 열 번호 → 변화량 목록으로 변환.
+    숫자 하나는 0부터 그 값까지 steps 단계로 나눕니다 (구간형 지표는 0부터 그 값까지 한 구간씩).
+    구간형 지표의 변화량은 정수여야 합니다. 입력이 잘못되었으면 ValueError.
+    """
+    if isinstance(steps, bool) or not isinstance(steps, int) or not 2 <= steps <= MAX_SCENARIOS:
+        raise ValueError(f"steps는 2 이상 {MAX_SCENARIOS} 이하의 정수여야 합니다: {steps!r}")
+    unknown = [name for name in changes if model.column_index(name) is None]
+    if unknown:
+        raise ValueError(f"시뮬레이션할 수 없는 지표입니다: {unknown}. 사용 가능한 지표: {model.columns}")
+
+    grid: Dict[int, List[float]] = {}
+    for name, value in changes.items():
+        j = model.column_index(name)
+        ends = [_finite(v, name) for v in value] if isinstance(value, (list, tuple)) else [_finite(value, name)]
+        if model.is_bucket(j) and any(v != int(v) for v in ends):
+            raise ValueError(f"'{name}'은 구간형 지표이므로 변화량은 정수(구간 단계)여야 합니다: {value!r}")
+
+        if isinstance(value, (list, tuple)):
+            if not value or len(value) > MAX_SCENARIOS:
+                raise ValueError(f"'{name}'의 변화량 목록은 1개 이상 {MAX_SCENARIOS}개 이하여야 합니다.")
+            values = ends
+        elif model.is_bucket(j):
+            step = 1 if ends[0] >= 0 else -1
+            values = [float(v) for v in range(0, int(ends[0]) + step, step)]
+        else:
+            values = np.linspace(0.0, ends[0], steps).tolist()
+        grid[j] = values
+
+    n_scenarios = math.prod(len(v) for v in grid.values())
+    if n_scenarios > MAX_SCENARIOS:
+        raise ValueError(f"시나리오가 너무 많습니다 ({n_scenarios}개, 최대 {MAX_SCENARIOS}개). 변화량 목록이나 steps를 줄여 주세요.")
+    return grid
+
+
+def _design(X: np.ndarray, median, mean, std) -> np.ndarray:
+    missing = np.isnan(X)
+    Z = np.clip((np.where(missing, median, X) - mean) / std, -Z_CLIP, Z_CLIP)
+    return np.c_[Z, Z ** 2, missing.astype(np.float64)]
+
+
+def _solve(F: np.ndarray, y: np.ndarray, lam: float) -> np.ndarray:
+    """절편은 규제하지 않는 릿지 회귀"""
+    A = np.c_[np.ones(len(F)), F]
+    reg = lam * np.eye(A.shape[1])
+    reg[0, 0] = 0.0
+    return np.linalg.solve(A.T @ A + reg, A.T @ y)
+
+
+def fit(df: pd.DataFrame, lam: float = 1.0, holdout: float = 0.2, seed: int = 0) -> Dict[str, Any]:
+    """지표 → 위험지수백분위 대리 모델 학습 (holdout R²를 기록한 뒤 전체 데이터로 다시 학습)"""
+    columns = shap_factor_columns(df)
+    rows = df[TARGET].notna().to_numpy()
+    X = raw_matrix(df, columns)[rows]
+    y = df[TARGET].to_numpy(dtype=np.float64)[rows]
+
+    median = np.nanmedian(X, axis=0)
+    filled = np.where(np.isnan(X), median, X)
+    mean, std = filled.mean(axis=0), filled.std(axis=0)
+    std[std == 0] = 1.0
+    F = _design(X, median, mean, std)
+
+    order = np.random.default_rng(seed).permutation(len(y))
+    n_test = int(len(y) * holdout)
+    test, train = order[:n_test], order[n_test:]
+    w = _solve(F[train], y[train], lam)
+    pred = np.clip(np.c_[np.ones(n_test), F[test]] @ w, y.min(), y.max())
+    r2 = 1 - ((pred - y[test]) ** 2).sum() / ((y[test] - y[test].mean()) ** 2).sum()
+
+    w = _solve(F, y, lam)
+    k = len(columns)
+    return {
+        "version": 1,
+        "target": TARGET,
+        "target_range": [float(y.min()), float(y.max())],
+        "intercept": float(w[0]),
+        "lambda": lam,
+        "rows": int(len(y)),
+        "holdout_r2": round(float(r2), 4),
+        "features": [
+            {
+                "column": col,
+                "median": float(median[j]), "mean": float(mean[j]), "std": float(std[j]),
+                "min": float(np.nanmin(X[:, j])), "max": float(np.nanmax(X[:, j])),
+                "w_lin": float(w[1 + j]), "w_sq": float(w[1 + k + j]), "w_miss": float(w[1 + 2 * k + j]),
+            }
+            for j, col in enumerate(columns)
+        ],
+    }
+
+
+def load(path: Path = MODEL_FILE) -> Optional[RiskSurrogate]:
+    """저장된 모델 계수 로드. 파일이 없으면 None."""
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"[risk_model] 모델 파일 없음 - {path}, 시뮬레이션을 사용할 수 없습니다.")
+        return None
+    with open(path, encoding="utf-8") as f:
+        model = RiskSurrogate(json.load(f))
+    logger.info(f"[risk_model] 모델 로드 - 지표 {len(model.columns)}개, holdout R²={model.model['holdout_r2']}")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="위험지수백분위 대리 모델 학습")
+    parser.add_argument("--csv", default="./data/df_ver2_with_shap.csv")
+    parser.add_argument("--out", default=str(MODEL_FILE))
+    parser.add_argument("--lam", type=float, default=1.0, help="릿지 규제 강도")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    model = fit(buckets.encode_frame(pd.read_csv(args.csv)), lam=args.lam)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False, indent=1)
+    logger.info(f"모델 저장 - {args.out}, 지표 {len(model['features'])}개, holdout R²={model['holdout_r2']}")
+
+
+if __name__ == "__main__":
+    main()
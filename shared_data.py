@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 잠금 없이 정리 (사용 중인 파일은 삭제 실패로 남음)
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+import buckets
+
+logger = logging.getLogger(__name__)
+
+# 워커들이 함께 붙는 공유 캐시 위치 (환경변수로 변경 가능)
+SHARED_DIR = Path(os.environ.get("MERCHANT_SHARED_DIR", "./data/.shared"))
+
+# 가맹점ID 인덱스 파일명
+ID_KEYS_FILE = "id_keys.npy"
+ID_ROWS_FILE = "id_rows.npy"
+META_FILE = "meta.json"
+LOCK_FILE = "attached.lock"
+
+# 저장 형식이 바뀌면 올려서 기존 세그먼트를 무효화
+SEGMENT_VERSION = 3
+
+
+def _signature(csv_path: Path) -> str:
+    """CSV 파일이 바뀌면 새 캐시를 만들도록 크기/수정시각으로 식별자 생성"""
+    stat = csv_path.stat()
+    return f"{csv_path.stem}-{stat.st_size}-{stat.st_mtime_ns}-v{SEGMENT_VERSION}"
+
+
+# 이 프로세스가 붙어 있는 세그먼트의 공유 잠금 (프로세스가 끝날 때까지 유지)
+_HELD_LOCKS: Dict[Path, object] = {}
+
+
+def _hold(target: Path) -> None:
+    """세그먼트에 공유 잠금을 걸어 다른 프로세스의 정리 대상에서 제외"""
+    if fcntl is None or target in _HELD_LOCKS:
+        return
+    f = open(target / LOCK_FILE, "a")
+    fcntl.flock(f, fcntl.LOCK_SH)
+    _HELD_LOCKS[target] = f
+
+
+def _remove_stale(target: Path, prefix: str) -> None:
+    """
+    같은 prefix의 이전 세그먼트(원본 크기/수정시각/버전이 다른 것) 중 아무 워커도 붙어 있지 않은 것을 삭제합니다.
+    배타 잠금을 얻지 못하면 아직 사용 중인 것이므로 남겨 둡니다.
+    """
+    pattern = re.compile(rf"{re.escape(prefix)}-[\d-]+-v\d+")
+    for sibling in SHARED_DIR.iterdir():
+        if sibling == target or not sibling.is_dir() or not pattern.fullmatch(sibling.name):
+            continue
+        if fcntl is not None:
+            with open(sibling / LOCK_FILE, "a") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    logger.info(f"[shared_data] 사용 중인 이전 세그먼트 유지 - {sibling}")
+                    continue
+                shutil.rmtree(sibling, ignore_errors=True)
+        else:
+            shutil.rmtree(sibling, ignore_errors=True)
+        logger.info(f"[shared_data] 이전 세그먼트 삭제 - {sibling}")
+
+
+def _publish(tmp_dir: Path, target: Path) -> None:
+    """임시 디렉터리를 세그먼트 이름으로 rename (다른 워커가 먼저 만들었으면 버림)"""
+    try:
+        os.rename(tmp_dir, target)
+        logger.info(f"[shared_data] 공유 세그먼트 생성 완료 - {target}")
+    except OSError:
+        logger.info(f"[shared_data] 다른 워커가 세그먼트를 먼저 생성함 - {target}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def attach_arrays(
+    name: str,
+    sources: List[Path],
+    build: Callable[[], Tuple[Dict[str, np.ndarray], Dict[str, Any]]],
+    params: Tuple[int, ...] = (),
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    원본 파일(sources)에서 파생된 인덱스 배열을 공유 세그먼트에 두고 읽기 전용 memmap으로 붙습니다.
+    원본의 크기/수정시각과 params가 같으면 기존 세그먼트를 쓰고, 없으면 build()로 (배열, 부가정보)를 만들어 저장합니다.
+    """
+    parts = [f"{p.stat().st_size}-{p.stat().st_mtime_ns}" for p in map(Path, sources)] + [str(v) for v in params]
+    target = SHARED_DIR / f"{name}-{'-'.join(parts)}-v{SEGMENT_VERSION}"
+    if not (target / META_FILE).exists():
+        arrays, extra = build()
+        SHARED_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".build-", dir=SHARED_DIR))
+        try:
+            for key, values in arrays.items():
+                np.save(tmp_dir / f"{key}.npy", np.ascontiguousarray(values))
+            with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"arrays": list(arrays), "extra": extra}, f, ensure_ascii=False)
+            _publish(tmp_dir, target)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    _hold(target)
+    _remove_stale(target, name)
+
+    with open(target / META_FILE, encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {key: np.load(target / f"{key}.npy", mmap_mode="r") for key in meta["arrays"]}
+    logger.info(f"[shared_data] 공유 배열 연결 - {target}, arrays={meta['arrays']}")
+    return arrays, meta["extra"]
+
+
+def _build_segment(csv_path: Path, target: Path, id_col: str) -> None:
+    """
+    CSV를 한 번 읽어 숫자형 컬럼(dtype별 2차원 배열 하나씩)과 가맹점ID 정렬 인덱스를 .npy로 저장합니다.
+    구간형 문자열 컬럼은 int8 코드로 바꿔 숫자형 블록에 함께 넣습니다.
+    임시 디렉터리에 쓴 뒤 rename 하므로 여러 워커가 동시에 만들어도 하나만 남습니다.
+    """
+    df = buckets.encode_frame(pd.read_csv(csv_path))
+    numeric_cols = df.select_dtypes(include="number").columns
+
+    # dtype별로 한 파일/한 블록 (같은 dtype 블록이 둘 이상이면 pandas가 하나로 합치면서 memmap이 복사됨)
+    groups: Dict[str, List[str]] = {}
+    for col in numeric_cols:
+        groups.setdefault(df[col].dtype.str, []).append(col)
+
+    SHARED_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".build-", dir=SHARED_DIR))
+    try:
+        blocks = []
+        for i, (dtype_str, cols) in enumerate(groups.items()):
+            file_name = f"numeric_{i}.npy"
+            np.save(tmp_dir / file_name, np.ascontiguousarray(df[cols].to_numpy(dtype=dtype_str)))
+            blocks.append({"file": file_name, "dtype": dtype_str, "columns": cols})
+
+        # 가맹점ID 정렬 인덱스: 고정폭 bytes 키 + 원래 행 위치
+        ids = df[id_col].astype(str).str.encode("utf-8").to_numpy(dtype=bytes)
+        order = np.argsort(ids, kind="stable")
+        np.save(tmp_dir / ID_KEYS_FILE, ids[order])
+        np.save(tmp_dir / ID_ROWS_FILE, order.astype(np.int64))
+
+        meta = {
+            "rows": int(len(df)),
+            "columns": list(df.columns),
+            "object_columns": [c for c in df.columns if c not in set(numeric_cols)],
+            "blocks": blocks,
+            "id_col": id_col,
+        }
+        with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        _publish(tmp_dir, target)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _check_shared(df: pd.DataFrame, mapped: Dict[str, np.ndarray]) -> None:
+    """숫자형 블록이 모두 memmap 위에 그대로 있는지 확인 (복사되었다면 워커별 메모리가 다시 늘어나므로 경고)"""
+    copied = [col for col, values in mapped.items() if not np.shares_memory(df[col].to_numpy(), values)]
+    if copied:
+        logger.warning(f"[shared_data] 숫자형 블록이 memmap에서 복사되어 워커별 메모리를 사용합니다: {copied}")
+
+
+class SharedIndex:
+    """공유 세그먼트에 올라간 가맹점ID → 행 위치 인덱스 (읽기 전용 memmap)"""
+
+    def __init__(self, keys: np.ndarray, rows: np.ndarray):
+        self.keys = keys
+        self.rows = rows
+
+    def positions(self, merchant_id: str) -> np.ndarray:
+        """merchant_id와 정확히 일치하는 행 위치 배열 (없으면 빈 배열)"""
+        key = np.array(str(merchant_id).encode("utf-8"), dtype=bytes)
+        left = np.searchsorted(self.keys, key, side="left")
+        right = np.searchsorted(self.keys, key, side="right")
+        return np.sort(self.rows[left:right])
+
+
+def attach(csv_path: str, id_col: str = "가맹점ID") -> Tuple[pd.DataFrame, SharedIndex, List[str]]:
+    """
+    공유 세그먼트에 읽기 전용으로 붙어 DataFrame과 ID 인덱스를 돌려줍니다.
+    숫자형 컬럼은 memmap 위에 복사 없이 올라가므로 워커 수가 늘어도 페이지 캐시 한 벌만 사용합니다.
+    숫자형 컬럼은 dtype별로 묶인 순서가 되므로 (재정렬하면 복사 발생) CSV의 원래 컬럼 순서를 함께 돌려줍니다.
+    응답용 row dict는 이 순서로 만드세요.
+    세그먼트가 없으면 먼저 생성합니다.
+    """
+    path = Path(csv_path)
+    target = SHARED_DIR / _signature(path)
+    if not (target / META_FILE).exists():
+        _build_segment(path, target, id_col)
+
+    _hold(target)
+    _remove_stale(target, path.stem)
+
+    with open(target / META_FILE, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    # 숫자형 블록: dtype별 2차원 memmap을 그대로 DataFrame 블록으로 사용 (dtype이 서로 달라 합쳐지지 않음)
+    mapped = {}
+    frames = []
+    for block in meta["blocks"]:
+        values = np.load(target / block["file"], mmap_mode="r")
+        mapped[block["columns"][0]] = values
+        frames.append(pd.DataFrame(values, columns=block["columns"], copy=False))
+    if frames:
+        df = pd.concat(frames, axis=1, copy=False)
+    else:
+        df = pd.DataFrame(index=pd.RangeIndex(meta["rows"]))
+
+    # 문자열 컬럼은 워커별로 읽되, 가능한 한 원래 컬럼 위치 근처에 끼워 넣음
+    object_cols = meta["object_columns"]
+    if object_cols:
+        obj_df = pd.read_csv(path, usecols=object_cols, dtype=object)
+        for col in object_cols:
+            df.insert(min(meta["columns"].index(col), len(df.columns)), col, obj_df[col])
+
+    _check_shared(df, mapped)
+
+    index = SharedIndex(
+        np.load(target / ID_KEYS_FILE, mmap_mode="r"),
+        np.load(target / ID_ROWS_FILE, mmap_mode="r"),
+    )
+    logger.info(f"[shared_data] 공유 세그먼트 연결 - {target}, rows={meta['rows']}")
+    return df, index, meta["columns"]